@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.database import get_db
+from app.models.database import Task
 from app.services.task_service import TaskService
 from app.schemas.task import TaskStatus
 
@@ -28,3 +29,21 @@ async def get_user_tasks(db: Session = Depends(get_db)):
     
     task_service = TaskService(db)
     return [task_service.get_task_status(task.id) for task in tasks if task_service.get_task_status(task.id)]
+
+@router.post("/task/{task_id}/retry", response_model=TaskStatus)
+async def retry_task(task_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """重新排队失败的任务，从上次完成的页面继续转换"""
+    from app.api.uploads import process_file_background
+    
+    task_service = TaskService(db)
+    task = task_service.get_task(task_id)
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    # 条件更新：重复点击或并发的重试只有一次生效
+    if not task_service.requeue_task(task_id):
+        raise HTTPException(status_code=409, detail=f"Task is {task.status}, only failed tasks can be retried")
+    
+    background_tasks.add_task(process_file_background, task_id, None, task.file_type)
+    
+    return task_service.get_task_status(task_id)
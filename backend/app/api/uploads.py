@@ -3,16 +3,22 @@ from sqlalchemy.orm import Session
 import uuid
 import os
 import tempfile
+import math
 import aiofiles
-from typing import List
+import logging
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.core.config import settings
-from app.services.storage_service import StorageService
+from app.core.runtime import get_runtime
+from app.converters.registry import supported_types
 from app.services.task_service import TaskService
-from app.services.file_processor import FileProcessor
-from app.schemas.task import TaskCreate
+from app.services.conversion_service import ConversionService
 from app.tasks.celery_tasks import process_file_task
+from app.schemas.task import TaskCreate
+from app.schemas.upload import UploadInitRequest, UploadInitResponse, UploadPartUrl, UploadCompleteRequest
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -43,7 +49,7 @@ async def upload_file(
             tmp_file_path = tmp_file.name
         
         # 上传到R2存储
-        storage_service = StorageService()
+        storage_service = get_runtime().storage
         file_key = f"uploads/{task_id}/{file.filename}"
         
         await storage_service.upload_file(tmp_file_path, file_key, file.content_type)
@@ -60,12 +66,9 @@ async def upload_file(
         
         task = task_service.create_task(task_data)
         
-        # 添加后台处理任务
+        # 添加后台处理任务（临时文件在处理结束后清理）
         background_tasks.add_task(process_file_background, task_id, tmp_file_path, file.content_type)
         
-        # 清理临时文件
-        os.unlink(tmp_file_path)
-        
         return {
             "taskId": task_id,
             "status": "uploaded",
@@ -75,29 +78,138 @@ async def upload_file(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-async def process_file_background(task_id: str, file_path: str, file_type: str):
-    """后台文件处理任务"""
-    from app.core.database import SessionLocal
+@router.post("/upload/initiate", response_model=UploadInitResponse)
+async def initiate_upload(request: UploadInitRequest, db: Session = Depends(get_db)):
+    """直传初始化：创建任务和分片上传，返回各分片的预签名URL，文件内容不经过API"""
     
-    db = SessionLocal()
+    filename = os.path.basename(request.filename)
+    if not any(filename.lower().endswith(ext) for ext in settings.ALLOWED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+    if request.contentType not in supported_types():
+        raise HTTPException(status_code=400, detail="Unsupported content type")
+    if request.size <= 0 or request.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail="File too large")
+    
+    task_id = str(uuid.uuid4())
+    file_key = f"uploads/{task_id}/{filename}"
+    storage_service = get_runtime().storage
+    upload_id = None
     try:
-        task_service = TaskService(db)
-        file_processor = FileProcessor()
-        
-        # 更新状态为处理中
-        task_service.update_task_status(task_id, "processing", 10)
+        upload_id = await storage_service.create_multipart_upload(file_key, request.contentType)
         
-        # 处理文件
-        pages = await file_processor.process_file(task_id, file_path, file_type)
+        # 分片数不能超过10000
+        part_size = max(settings.UPLOAD_PART_SIZE, math.ceil(request.size / 10000))
+        part_count = max(1, math.ceil(request.size / part_size))
+        parts = [
+            UploadPartUrl(
+                partNumber=part_number,
+                url=storage_service.presign_upload_part(
+                    file_key, upload_id, part_number, settings.UPLOAD_URL_EXPIRES
+                )
+            )
+            for part_number in range(1, part_count + 1)
+        ]
         
-        # 保存页面信息
-        task_service.add_pages(task_id, pages)
+        TaskService(db).create_task(TaskCreate(
+            id=task_id,
+            original_name=filename,
+            file_key=file_key,
+            file_type=request.contentType,
+            file_size=request.size,
+            status="uploading",
+            upload_id=upload_id
+        ))
         
-        # 更新状态为完成
-        task_service.update_task_status(task_id, "completed", 100)
+        return UploadInitResponse(
+            taskId=task_id,
+            uploadId=upload_id,
+            partSize=part_size,
+            parts=parts,
+            expiresIn=settings.UPLOAD_URL_EXPIRES
+        )
         
     except Exception as e:
-        # 更新状态为失败
-        task_service.update_task_status(task_id, "failed", 0, str(e))
+        # 任务没有创建成功，取消分片上传，避免遗留无人清理的分片
+        if upload_id:
+            try:
+                await storage_service.abort_multipart_upload(file_key, upload_id)
+            except Exception as abort_error:
+                logger.error(f"Failed to abort multipart upload for {file_key}: {abort_error}")
+        raise HTTPException(status_code=500, detail=f"Upload initiation failed: {str(e)}")
+
+@router.post("/upload/{task_id}/complete")
+async def complete_upload(
+    task_id: str,
+    request: UploadCompleteRequest,
+    db: Session = Depends(get_db)
+):
+    """直传完成：合并分片并开始转换"""
+    task_service = TaskService(db)
+    task = task_service.get_task(task_id)
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not request.parts:
+        raise HTTPException(status_code=400, detail="No parts uploaded")
+    
+    # 条件更新认领任务，重复或并发的完成请求不会重复开始转换
+    if not task_service.claim_upload(task_id, request.uploadId):
+        raise HTTPException(status_code=409, detail="Upload is not in progress")
+    
+    parts = [
+        {"PartNumber": part.partNumber, "ETag": part.etag}
+        for part in sorted(request.parts, key=lambda part: part.partNumber)
+    ]
+    try:
+        file_size = await get_runtime().storage.complete_multipart_upload(task.file_key, request.uploadId, parts)
+    except Exception as e:
+        task_service.release_upload(task_id)
+        raise HTTPException(status_code=400, detail=f"Upload completion failed: {str(e)}")
+    
+    if file_size > settings.MAX_FILE_SIZE:
+        await get_runtime().storage.delete_file(task.file_key)
+        task_service.update_task_status(task_id, "failed", 0, "File too large")
+        raise HTTPException(status_code=400, detail="File too large")
+    
+    task_service.mark_uploaded(task_id, file_size)
+    
+    # 原文件已在存储中，交给Celery worker转换，API进程只负责控制面
+    process_file_task.delay(task_id, None, task.file_type)
+    
+    return {
+        "taskId": task_id,
+        "status": "uploaded",
+        "message": "File uploaded successfully, conversion started"
+    }
+
+@router.delete("/upload/{task_id}")
+async def abort_upload(task_id: str, db: Session = Depends(get_db)):
+    """取消直传，释放已上传的分片"""
+    task_service = TaskService(db)
+    task = task_service.get_task(task_id)
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task.status != "uploading":
+        raise HTTPException(status_code=409, detail="Upload is not in progress")
+    
+    try:
+        await get_runtime().storage.abort_multipart_upload(task.file_key, task.upload_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload abort failed: {str(e)}")
+    
+    task_service.update_task_status(task_id, "failed", 0, "Upload aborted")
+    return {"taskId": task_id, "status": "failed", "message": "Upload aborted"}
+
+async def process_file_background(task_id: str, file_path: Optional[str], file_type: str):
+    """后台文件处理任务（file_path为空时从存储下载原文件，已上传的页面会被跳过）"""
+    db = get_runtime().session_factory()
+    try:
+        await ConversionService(db).convert(task_id, file_path, file_type)
+    except Exception:
+        # 失败状态已由ConversionService记录，可通过重新排队从断点继续
+        pass
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        if file_path and os.path.exists(file_path):
+            os.unlink(file_path)
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import logging
+from typing import Iterator, Set, Tuple
+from PIL import Image, ImageOps, ExifTags, JpegImagePlugin
+
+from app.core.config import settings
+from app.converters.registry import RenderedPage
+
+logger = logging.getLogger(__name__)
+
+_JPEG_MAGIC = b"\xff\xd8\xff"
+
+# EXIF方向为5-8时图片需要旋转90度，缩放目标的宽高要对调
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+def convert(image_path: str, temp_dir: str, skip_pages: Set[int]) -> Iterator[RenderedPage]:
+    """处理单张图片"""
+    if 1 in skip_pages:
+        yield (1, None, 1)
+        return
+    
+    try:
+        # 按输出尺寸解码并应用EXIF方向
+        img = open_scaled_image(image_path, (settings.IMAGE_MAX_WIDTH, settings.IMAGE_MAX_HEIGHT))
+        
+        # 保存优化后的图片
+        output_path = os.path.join(temp_dir, "page_1.png")
+        img.save(output_path, "PNG", optimize=True)
+    except ValueError:
+        # 图片超出解码限制，直接让任务失败
+        raise
+    except Exception as e:
+        logger.error(f"Image processing error: {e}")
+        return
+    
+    yield (1, output_path, 1)
+
+def open_scaled_image(image_path: str, max_size: Tuple[int, int], check_budget: bool = True) -> Image.Image:
+    """按目标尺寸解码图片，内存和耗时取决于输出尺寸而不是原图尺寸
+
+    JPEG通过draft在DCT阶段直接按1/2、1/4、1/8缩放解码，随后thumbnail先用reduce()
+    做整数倍快速缩小再用LANCZOS精修；EXIF方向在缩小后的图片上应用。
+    无法按比例解码的格式（如PNG）按完整尺寸计算，超过IMAGE_MAX_DECODE_PIXELS时拒绝处理，
+    这类图片的内存占用随原图尺寸增长，约为 像素数 x 4 字节。check_budget=False 用于worker自己渲染的图片。
+    """
+    img = _open_image(image_path)
+    
+    orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+    if orientation in _TRANSPOSED_ORIENTATIONS:
+        max_size = (max_size[1], max_size[0])
+    
+    # 按保持宽高比后的目标尺寸请求解码，保留2倍余量（与reducing_gap一致）保证LANCZOS缩放质量
+    reducing_gap = 2.0
+    ratio = min(max_size[0] / img.width, max_size[1] / img.height, 1.0)
+    img.draft(None, (int(img.width * ratio * reducing_gap), int(img.height * ratio * reducing_gap)))
+    
+    decoded_pixels = img.width * img.height
+    if check_budget and decoded_pixels > settings.IMAGE_MAX_DECODE_PIXELS:
+        img.close()
+        raise ValueError(
+            f"Image too large to decode: {img.width}x{img.height} "
+            f"exceeds {settings.IMAGE_MAX_DECODE_PIXELS} pixels"
+        )
+    
+    img.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+    img = ImageOps.exif_transpose(img)
+    
+    # PNG不支持CMYK等模式
+    if img.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+        img = img.convert("RGB")
+    return img
+
+def _open_image(image_path: str) -> Image.Image:
+    """打开图片，只解析文件头
+
+    JPEG直接构造解码器，跳过Image.open按原图尺寸做的解压炸弹检查，改由调用方按缩放解码后的
+    尺寸检查；其他格式仍经过Pillow的全局 MAX_IMAGE_PIXELS 限制，超过时同样以ValueError拒绝。
+    """
+    with open(image_path, "rb") as f:
+        magic = f.read(len(_JPEG_MAGIC))
+    if magic == _JPEG_MAGIC:
+        return JpegImagePlugin.JpegImageFile(image_path)
+    try:
+        return Image.open(image_path)
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Image too large to decode: {e}") from e
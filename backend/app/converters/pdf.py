@@ -0,0 +1,80 @@
+import os
+import logging
+from typing import Iterator, Set
+import fitz  # PyMuPDF
+
+from app.core.config import settings
+from app.converters.image import open_scaled_image
+from app.converters.registry import RenderedPage
+
+logger = logging.getLogger(__name__)
+
+def convert(pdf_path: str, temp_dir: str, skip_pages: Set[int]) -> Iterator[RenderedPage]:
+    """逐页渲染PDF，skip_pages中的页码不渲染，路径为None"""
+    doc = fitz.open(pdf_path)
+    try:
+        total = doc.page_count
+        for page_num in range(total):
+            if page_num + 1 in skip_pages:
+                yield (page_num + 1, None, total)
+                continue
+            
+            page = doc[page_num]
+            pix = page.get_pixmap(matrix=_render_matrix(page))
+            
+            # 保存为PNG
+            img_path = os.path.join(temp_dir, f"page_{page_num + 1}.png")
+            pix.save(img_path)
+            
+            # 优化图片尺寸
+            optimized_path = optimize_image(img_path, temp_dir, page_num + 1)
+            yield (page_num + 1, optimized_path, total)
+    finally:
+        doc.close()
+
+def _render_matrix(page: fitz.Page) -> fitz.Matrix:
+    """按PDF_DPI渲染，大幅面页面（如A0）缩小到输出尺寸的2倍以内（与缩放余量一致）"""
+    rect = page.rect
+    zoom = min(
+        settings.PDF_DPI / 72,
+        2 * settings.IMAGE_MAX_WIDTH / rect.width,
+        2 * settings.IMAGE_MAX_HEIGHT / rect.height
+    )
+    return fitz.Matrix(zoom, zoom)
+
+def pdf_to_images(pdf_path: str, temp_dir: str, skip_pages: Set[int]) -> Iterator[RenderedPage]:
+    """逐页将PDF转为图片（不做尺寸优化）"""
+    doc = fitz.open(pdf_path)
+    try:
+        total = doc.page_count
+        for page_num in range(total):
+            if page_num + 1 in skip_pages:
+                yield (page_num + 1, None, total)
+                continue
+            
+            page = doc[page_num]
+            mat = fitz.Matrix(2.0, 2.0)
+            pix = page.get_pixmap(matrix=mat)
+            
+            img_path = os.path.join(temp_dir, f"page_{page_num + 1}.png")
+            pix.save(img_path)
+            yield (page_num + 1, img_path, total)
+    finally:
+        doc.close()
+
+def optimize_image(image_path: str, temp_dir: str, page_num: int) -> str:
+    """优化图片尺寸和质量"""
+    try:
+        # 渲染结果由worker自己生成，不受上传文件的解码限制
+        img = open_scaled_image(
+            image_path, (settings.IMAGE_MAX_WIDTH, settings.IMAGE_MAX_HEIGHT), check_budget=False
+        )
+
+        # 保存优化后的图片
+        optimized_path = os.path.join(temp_dir, f"optimized_page_{page_num}.png")
+        img.save(optimized_path, "PNG", optimize=True)
+
+        return optimized_path
+    except Exception as e:
+        logger.error(f"Image optimization error: {e}")
+        return image_path  # 返回原图片路径
@@ -0,0 +1,39 @@
+import importlib
+import logging
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 转换器签名：convert(文件路径, 临时目录, 跳过的页码)，逐页产出 (页码, 图片路径或None, 总页数)，
+# 每渲染完一页立即产出，调用方可以边渲染边上传并记录断点
+RenderedPage = Tuple[int, Optional[str], int]
+Converter = Callable[[str, str, Set[int]], Iterator[RenderedPage]]
+
+# MIME类型 -> 转换器模块，模块在首次使用时才导入，
+# API进程不会加载渲染依赖，worker也只加载实际处理过的格式
+CONVERTERS: Dict[str, str] = {
+    "application/pdf": "app.converters.pdf",
+    "application/vnd.ms-powerpoint": "app.converters.powerpoint",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": "app.converters.powerpoint",
+    "application/msword": "app.converters.word",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "app.converters.word",
+    "image/jpeg": "app.converters.image",
+    "image/png": "app.converters.image",
+}
+
+def register_converter(file_type: str, module_path: str):
+    """注册转换器插件，模块需提供 convert 函数"""
+    CONVERTERS[file_type] = module_path
+
+def supported_types() -> List[str]:
+    """支持的MIME类型"""
+    return list(CONVERTERS)
+
+def get_converter(file_type: str) -> Converter:
+    """按MIME类型获取转换器，首次调用时导入对应模块"""
+    module_path = CONVERTERS.get(file_type)
+    if not module_path:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    
+    module = importlib.import_module(module_path)
+    return module.convert
@@ -0,0 +1,42 @@
+import os
+import logging
+from typing import Iterator, Set
+import docx
+import pdfkit
+
+from app.converters.pdf import pdf_to_images
+from app.converters.registry import RenderedPage
+
+logger = logging.getLogger(__name__)
+
+def convert(word_path: str, temp_dir: str, skip_pages: Set[int]) -> Iterator[RenderedPage]:
+    """处理Word文件"""
+    try:
+        # 读取Word文档内容
+        doc = docx.Document(word_path)
+        text_content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        safe_text = text_content.replace('\n', '<br>')
+        # 转为HTML
+        html_content = f"""
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }}
+                p {{ margin-bottom: 10px; }}
+            </style>
+        </head>
+        <body>
+            {safe_text}
+        </body>
+        </html>
+        """
+        
+        # HTML转PDF
+        pdf_path = os.path.join(temp_dir, "temp.pdf")
+        pdfkit.from_string(html_content, pdf_path)
+        
+        # PDF逐页转图片
+        yield from pdf_to_images(pdf_path, temp_dir, skip_pages)
+        
+    except Exception as e:
+        logger.error(f"Word processing error: {e}")
@@ -1,3 +1,4 @@
+import os
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
@@ -15,6 +16,21 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def init_db():
+    """把数据库升级到最新迁移版本（在应用启动时调用，而不是导入时）
+
+    表结构由 app/migrations 下的Alembic迁移维护；关闭 DB_AUTO_MIGRATE 时
+    需要在发布前执行 alembic upgrade head。
+    """
+    if not settings.DB_AUTO_MIGRATE:
+        return
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", os.path.join(os.path.dirname(__file__), "..", "migrations"))
+    command.upgrade(config, "head")
+
 def get_db() -> Session:
     db = SessionLocal()
     try:
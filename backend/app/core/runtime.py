@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+class WorkerRuntime:
+    """进程级运行时：所有转换共用的线程池、存储客户端、事件循环和数据库会话工厂
+
+    Celery worker在 worker_process_init 中初始化，FastAPI在启动事件中初始化，
+    进程退出时调用 shutdown 释放资源。
+    worker中每个执行任务的线程使用自己的事件循环：prefork/solo池只有一个线程，
+    threads池的多个线程可以同时执行任务。gevent/eventlet池不支持（见 celery_tasks）。
+    """
+
+    def __init__(self, own_loop: bool = False):
+        from app.services.storage_service import StorageService
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.CONVERTER_THREADS,
+            thread_name_prefix="converter"
+        )
+        self.storage = StorageService()
+        self.session_factory = SessionLocal
+        # API进程使用uvicorn的事件循环，Celery worker持有自己的事件循环
+        self.own_loop = own_loop
+        self._local = threading.local()
+        self._loops: List[asyncio.AbstractEventLoop] = []
+        self._loops_lock = threading.Lock()
+
+    def run(self, coro):
+        """在当前线程的事件循环中执行协程（仅限持有事件循环的worker进程）"""
+        if not self.own_loop:
+            raise RuntimeError("Runtime has no event loop of its own")
+        return self._thread_loop().run_until_complete(coro)
+
+    def _thread_loop(self) -> asyncio.AbstractEventLoop:
+        """当前线程的事件循环，首次使用时创建"""
+        loop = getattr(self._local, "loop", None)
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._local.loop = loop
+            with self._loops_lock:
+                self._loops.append(loop)
+        return loop
+
+    def shutdown(self):
+        """关闭线程池和事件循环"""
+        self.executor.shutdown(wait=True)
+        with self._loops_lock:
+            loops, self._loops = self._loops, []
+        for loop in loops:
+            if loop.is_closed() or loop.is_running():
+                continue
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+        self.storage.close()
+
+_runtime: Optional[WorkerRuntime] = None
+_runtime_lock = threading.Lock()
+
+def init_runtime(own_loop: bool = False) -> WorkerRuntime:
+    """初始化当前进程的运行时"""
+    global _runtime
+    # threads池中多个线程可能同时首次获取运行时
+    with _runtime_lock:
+        if _runtime is None:
+            if own_loop:
+                # prefork子进程继承了父进程的连接池，丢弃这些连接但不关闭父进程的socket
+                engine.dispose(close=False)
+            _runtime = WorkerRuntime(own_loop=own_loop)
+            logger.info(f"Worker runtime initialized (converter threads: {settings.CONVERTER_THREADS})")
+    return _runtime
+
+def get_runtime() -> WorkerRuntime:
+    """获取当前进程的运行时，未初始化时（如solo模式或脚本）按所在环境创建"""
+    if _runtime is None:
+        try:
+            asyncio.get_running_loop()
+            own_loop = False
+        except RuntimeError:
+            own_loop = True
+        return init_runtime(own_loop=own_loop)
+    return _runtime
+
+def shutdown_runtime():
+    """释放当前进程的运行时"""
+    global _runtime
+    if _runtime is not None:
+        _runtime.shutdown()
+        _runtime = None
+        logger.info("Worker runtime shut down")
@@ -7,12 +7,15 @@ CREATE TABLE tasks (
 	file_type VARCHAR NOT NULL, 
 	file_size INTEGER, 
 	status VARCHAR, 
+	upload_id VARCHAR, 
 	progress INTEGER, 
 	total_pages INTEGER, 
+	attempts INTEGER, 
 	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
 	updated_at DATETIME, 
 	completed_at DATETIME, 
 	error_message TEXT, 
+	bundle_url VARCHAR, 
 	PRIMARY KEY (id)
 );
 CREATE TABLE pages (
@@ -23,8 +26,21 @@ CREATE TABLE pages (
 	thumbnail_url VARCHAR, 
 	width INTEGER, 
 	height INTEGER, 
+	byte_offset INTEGER, 
+	byte_length INTEGER, 
 	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
 	PRIMARY KEY (id), 
+	CONSTRAINT uq_pages_task_page UNIQUE (task_id, page_number), 
 	FOREIGN KEY(task_id) REFERENCES tasks (id)
 );
+CREATE INDEX ix_pages_image_url ON pages (image_url);
+CREATE TABLE page_objects (
+	content_hash VARCHAR(64) NOT NULL, 
+	object_key VARCHAR NOT NULL, 
+	url VARCHAR NOT NULL, 
+	size INTEGER, 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	last_used_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	PRIMARY KEY (content_hash)
+);
 COMMIT;
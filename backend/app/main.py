@@ -10,13 +10,10 @@ from typing import List, Optional
 import logging
 
 from app.core.config import settings
-from app.core.database import get_db, engine
-from app.models.database import Base
+from app.core.database import init_db
+from app.core.runtime import init_runtime, get_runtime, shutdown_runtime
 from app.api import tasks, flipbooks, uploads
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="Flipbook Converter API",
     description="Convert documents to interactive flipbooks",
@@ -40,6 +37,47 @@ app.include_router(tasks.router, prefix="/api", tags=["tasks"])
 app.include_router(flipbooks.router, prefix="/api", tags=["flipbooks"])
 app.include_router(uploads.router, prefix="/api", tags=["uploads"])
 
+# 持有后台恢复任务的引用，避免被垃圾回收
+_recovery_jobs = set()
+_stale_task_sweep = None
+
+@app.on_event("startup")
+def startup():
+    """启动时执行数据库迁移并初始化进程级运行时"""
+    init_db()
+    init_runtime()
+
+@app.on_event("startup")
+async def start_stale_task_sweep():
+    """启动定期扫描：在API进程内重新转换租约超时的任务（worker崩溃或后台任务丢失）"""
+    global _stale_task_sweep
+    _stale_task_sweep = asyncio.create_task(sweep_stale_tasks())
+
+async def sweep_stale_tasks():
+    """启动时立即扫描一次，之后每隔 TASK_SWEEP_INTERVAL 秒扫描"""
+    from app.services.conversion_service import ConversionService
+    from app.api.uploads import process_file_background
+    
+    while True:
+        db = get_runtime().session_factory()
+        try:
+            for task_id, file_type in ConversionService(db).claim_stale_tasks():
+                job = asyncio.create_task(process_file_background(task_id, None, file_type))
+                _recovery_jobs.add(job)
+                job.add_done_callback(_recovery_jobs.discard)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Stale task sweep failed: {e}")
+        finally:
+            db.close()
+        await asyncio.sleep(settings.TASK_SWEEP_INTERVAL)
+
+@app.on_event("shutdown")
+def shutdown():
+    """停止定期扫描并关闭进程级运行时"""
+    if _stale_task_sweep:
+        _stale_task_sweep.cancel()
+    shutdown_runtime()
+
 @app.get("/")
 async def root():
     return {"message": "Flipbook Converter API", "version": "1.0.0"}
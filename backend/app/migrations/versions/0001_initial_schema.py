@@ -0,0 +1,60 @@
+"""初始表结构：tasks、pages
+
+引入迁移之前由 create_all 建好的数据库已经有这两张表，此时跳过创建，
+直接在其上执行后续迁移。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # 生成SQL脚本（--sql）时无法检查数据库，按空库处理
+    if op.get_context().as_sql:
+        existing = set()
+    else:
+        existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "tasks" not in existing:
+        op.create_table(
+            "tasks",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("original_name", sa.String(), nullable=False),
+            sa.Column("file_key", sa.String(), nullable=False),
+            sa.Column("file_type", sa.String(), nullable=False),
+            sa.Column("file_size", sa.Integer()),
+            sa.Column("status", sa.String()),
+            sa.Column("progress", sa.Integer()),
+            sa.Column("total_pages", sa.Integer()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+            sa.Column("completed_at", sa.DateTime(timezone=True)),
+            sa.Column("error_message", sa.Text()),
+            sa.PrimaryKeyConstraint("id")
+        )
+
+    if "pages" not in existing:
+        op.create_table(
+            "pages",
+            sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column("task_id", sa.String(), nullable=False),
+            sa.Column("page_number", sa.Integer(), nullable=False),
+            sa.Column("image_url", sa.String(), nullable=False),
+            sa.Column("thumbnail_url", sa.String()),
+            sa.Column("width", sa.Integer()),
+            sa.Column("height", sa.Integer()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.ForeignKeyConstraint(["task_id"], ["tasks.id"]),
+            sa.PrimaryKeyConstraint("id")
+        )
+
+def downgrade():
+    op.drop_table("pages")
+    op.drop_table("tasks")
@@ -0,0 +1,30 @@
+"""按页断点续转：任务执行次数、每页唯一约束
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("tasks", sa.Column("attempts", sa.Integer(), server_default="0"))
+
+    # 重试可能留下同一页的多条记录，加唯一约束前只保留最早的一条
+    op.execute(
+        "DELETE FROM pages WHERE id NOT IN "
+        "(SELECT MIN(id) FROM pages GROUP BY task_id, page_number)"
+    )
+    with op.batch_alter_table("pages") as batch_op:
+        batch_op.create_unique_constraint("uq_pages_task_page", ["task_id", "page_number"])
+
+def downgrade():
+    with op.batch_alter_table("pages") as batch_op:
+        batch_op.drop_constraint("uq_pages_task_page", type_="unique")
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.drop_column("attempts")
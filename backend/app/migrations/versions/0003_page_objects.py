@@ -0,0 +1,27 @@
+"""页面去重：按内容哈希共享的页面对象索引
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "page_objects",
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("object_key", sa.String(), nullable=False),
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("size", sa.Integer()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("content_hash")
+    )
+
+def downgrade():
+    op.drop_table("page_objects")
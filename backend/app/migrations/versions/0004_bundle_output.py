@@ -0,0 +1,25 @@
+"""bundle输出：任务的bundle对象URL、页面在bundle中的字节范围
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("tasks", sa.Column("bundle_url", sa.String()))
+    op.add_column("pages", sa.Column("byte_offset", sa.Integer()))
+    op.add_column("pages", sa.Column("byte_length", sa.Integer()))
+
+def downgrade():
+    with op.batch_alter_table("pages") as batch_op:
+        batch_op.drop_column("byte_length")
+        batch_op.drop_column("byte_offset")
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.drop_column("bundle_url")
@@ -0,0 +1,28 @@
+"""过期清理：页面URL索引、页面对象最后使用时间
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_pages_image_url", "pages", ["image_url"])
+
+    # SQLite的ADD COLUMN不支持非常量默认值，需要重建表
+    recreate = "always" if op.get_bind().dialect.name == "sqlite" else "auto"
+    with op.batch_alter_table("page_objects", recreate=recreate) as batch_op:
+        batch_op.add_column(
+            sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+        )
+
+def downgrade():
+    with op.batch_alter_table("page_objects") as batch_op:
+        batch_op.drop_column("last_used_at")
+    op.drop_index("ix_pages_image_url", table_name="pages")
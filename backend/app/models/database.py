@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -11,26 +11,46 @@ class Task(Base):
     file_key = Column(String, nullable=False)
     file_type = Column(String, nullable=False)
     file_size = Column(Integer, default=0)
-    status = Column(String, default="uploaded")  # uploaded, processing, completed, failed
+    status = Column(String, default="uploaded")  # uploading, completing, uploaded, processing, completed, failed
+    upload_id = Column(String)  # 客户端直传存储时的分片上传ID
     progress = Column(Integer, default=0)
     total_pages = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)  # 已执行的转换次数，用于崩溃恢复
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     completed_at = Column(DateTime(timezone=True))
     error_message = Column(Text)
+    bundle_url = Column(String)  # 打包输出时所有页面所在的对象URL
     
     pages = relationship("Page", back_populates="task", cascade="all, delete-orphan")
 
 class Page(Base):
     __tablename__ = "pages"
+    __table_args__ = (
+        # 每页只保留一条记录，页面记录同时作为转换断点
+        UniqueConstraint("task_id", "page_number", name="uq_pages_task_page"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     task_id = Column(String, ForeignKey("tasks.id"), nullable=False)
     page_number = Column(Integer, nullable=False)
-    image_url = Column(String, nullable=False)
+    image_url = Column(String, nullable=False, index=True)  # 索引用于清理时判断共享页面对象是否仍被引用
     thumbnail_url = Column(String)
     width = Column(Integer)
     height = Column(Integer)
+    byte_offset = Column(Integer)  # 打包输出时页面在bundle中的字节偏移
+    byte_length = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    task = relationship("Task", back_populates="pages")
\ No newline at end of file
+    task = relationship("Task", back_populates="pages")
+
+class PageObject(Base):
+    """按内容寻址的页面图片索引，相同页面在所有flipbook间共享同一对象"""
+    __tablename__ = "page_objects"
+    
+    content_hash = Column(String(64), primary_key=True)  # 编码后PNG的SHA-256
+    object_key = Column(String, nullable=False)
+    url = Column(String, nullable=False)
+    size = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())  # 去重命中时刷新，清理宽限期以此计算
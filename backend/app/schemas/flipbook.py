@@ -6,10 +6,15 @@ class FlipbookPage(BaseModel):
     page: int
     url: str
     thumbnailUrl: Optional[str] = None
+    # 打包格式时url为bundle地址，页面通过 Range: bytes=byteOffset-(byteOffset+byteLength-1) 读取
+    byteOffset: Optional[int] = None
+    byteLength: Optional[int] = None
 
 class FlipbookResponse(BaseModel):
     taskId: str
     title: str
     totalPages: int
     pages: List[FlipbookPage]
+    format: str = "pages"  # pages | bundle
+    bundleUrl: Optional[str] = None
     createdAt: str
\ No newline at end of file
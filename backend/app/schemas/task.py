@@ -7,8 +7,11 @@ class TaskBase(BaseModel):
     file_type: str
 
 class TaskCreate(TaskBase):
+    id: str
     file_key: str
     file_size: int
+    status: str = "uploaded"
+    upload_id: Optional[str] = None
 
 class TaskResponse(TaskBase):
     id: str
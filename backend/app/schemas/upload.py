@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import List
+
+class UploadInitRequest(BaseModel):
+    filename: str
+    contentType: str
+    size: int
+
+class UploadPartUrl(BaseModel):
+    partNumber: int
+    url: str
+
+class UploadInitResponse(BaseModel):
+    taskId: str
+    uploadId: str
+    partSize: int
+    parts: List[UploadPartUrl]
+    expiresIn: int
+
+class CompletedPart(BaseModel):
+    partNumber: int
+    etag: str
+
+class UploadCompleteRequest(BaseModel):
+    uploadId: str
+    parts: List[CompletedPart]
@@ -0,0 +1,127 @@
+import os
+import asyncio
+import tempfile
+import logging
+from typing import List, Tuple, Optional
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.runtime import get_runtime
+from app.services.task_service import TaskService
+from app.services.file_processor import FileProcessor
+from app.services.dedup_service import PageDedupService
+
+logger = logging.getLogger(__name__)
+
+class ConversionService:
+    """执行一次转换：支持按页断点续转，崩溃或重试后从上次完成的页面继续"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.task_service = TaskService(db)
+
+    async def convert(self, task_id: str, file_path: Optional[str] = None, file_type: Optional[str] = None) -> List[Tuple[int, str]]:
+        """转换任务文件，失败时标记任务状态并重新抛出异常"""
+        task = self.task_service.get_task(task_id)
+        if not task:
+            raise ValueError(f"Task not found: {task_id}")
+
+        if task.status == "completed":
+            logger.info(f"Task {task_id} already completed, skipping")
+            return sorted(self.task_service.get_completed_pages(task_id).items())
+
+        if (task.attempts or 0) >= settings.TASK_MAX_ATTEMPTS:
+            message = f"Giving up after {task.attempts} attempts"
+            self.task_service.update_task_status(task_id, "failed", task.progress, message)
+            raise RuntimeError(message)
+
+        # 重复投递的消息或并发的重试认领失败时直接返回，不影响正在执行的转换
+        if not self.task_service.start_attempt(task_id, settings.TASK_LEASE_TIMEOUT):
+            logger.info(f"Task {task_id} is already being converted, skipping")
+            return []
+
+        file_type = file_type or task.file_type
+        downloaded_path = None
+        heartbeat = None
+        try:
+            # 渲染、打包等阶段可能长时间没有页面完成，定期刷新租约避免被当作崩溃重新排队
+            heartbeat = asyncio.create_task(self._keep_lease(task_id))
+            completed_pages = self.task_service.get_completed_pages(task_id)
+
+            # 本地临时文件不存在时（重试、换了worker）从存储重新下载原文件
+            if not file_path or not os.path.exists(file_path):
+                downloaded_path = await self._download_source(task.file_key)
+                file_path = downloaded_path
+
+            async def on_page_uploaded(page_num: int, url: str, total: int):
+                done = len(completed_pages) + 1
+                completed_pages[page_num] = url
+                progress = 10 + int(85 * done / max(total, 1))
+                self.task_service.save_page_checkpoint(task_id, page_num, url, progress)
+
+            file_processor = FileProcessor()
+            deduplicator = None
+            if settings.OUTPUT_FORMAT == "bundle":
+                # bundle整体上传一次，没有逐页断点，重试时重新生成
+                completed_pages = {}
+            elif settings.PAGE_DEDUP_ENABLED:
+                deduplicator = PageDedupService(self.db, file_processor.storage_service)
+            
+            pages = await file_processor.process_file(
+                task_id, file_path, file_type,
+                completed_pages=dict(completed_pages),
+                on_page_uploaded=on_page_uploaded,
+                deduplicator=deduplicator,
+                output_format=settings.OUTPUT_FORMAT
+            )
+
+            # 保存页面信息并更新状态为完成
+            self.task_service.add_pages(task_id, pages)
+            self.task_service.update_task_status(task_id, "completed", 100)
+            return pages
+
+        except Exception as e:
+            logger.error(f"Conversion failed for task {task_id}: {e}")
+            # 失败可能发生在事务中途（如写入页面断点时冲突），回滚后会话才能继续使用
+            self.db.rollback()
+            try:
+                progress = self.task_service.get_task(task_id).progress
+                self.task_service.update_task_status(task_id, "failed", progress or 0, str(e))
+            except Exception as status_error:
+                # 状态更新失败不能掩盖原始异常，任务留在处理中，租约过期后由清扫重新排队
+                logger.error(f"Failed to mark task {task_id} as failed: {status_error}")
+            raise
+        finally:
+            if heartbeat:
+                heartbeat.cancel()
+            if downloaded_path and os.path.exists(downloaded_path):
+                os.unlink(downloaded_path)
+
+    async def _keep_lease(self, task_id: str):
+        """转换期间每隔租约时间的1/3刷新一次任务的 updated_at"""
+        interval = max(settings.TASK_LEASE_TIMEOUT / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            # 使用独立会话，不影响转换流程中的事务
+            db = get_runtime().session_factory()
+            try:
+                if not TaskService(db).refresh_lease(task_id):
+                    return
+            except Exception as e:
+                logger.warning(f"Failed to refresh lease for task {task_id}: {e}")
+            finally:
+                db.close()
+
+    async def _download_source(self, file_key: str) -> str:
+        """从存储下载原始上传文件到临时目录"""
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(file_key)[1])
+        os.close(fd)
+        await get_runtime().storage.download_file(file_key, path)
+        return path
+
+    def claim_stale_tasks(self) -> List[Tuple[str, str]]:
+        """认领租约超时的任务（worker崩溃遗留或派发丢失），返回 (任务ID, 文件类型) 列表"""
+        tasks = self.task_service.claim_stale_tasks(settings.TASK_LEASE_TIMEOUT)
+        for task in tasks:
+            logger.warning(f"Re-queuing stale task {task.id} (attempts: {task.attempts})")
+        return [(task.id, task.file_type) for task in tasks]
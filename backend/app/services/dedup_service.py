@@ -0,0 +1,148 @@
+import os
+import uuid
+import hashlib
+import asyncio
+import logging
+from typing import List, Tuple, Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.runtime import get_runtime
+from app.models.database import PageObject
+from app.services.storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+# 登记新对象时与清理任务、其他worker竞争的最大重试次数
+REGISTER_ATTEMPTS = 3
+
+class PageDedupService:
+    """页面去重：相同的页面只上传一次，后续页面直接复用已存储的对象
+
+    跨flipbook只按内容哈希精确复用；开启感知哈希时，近似相同的页面只在当前flipbook内合并，
+    并且必须通过逐像素比对确认，避免把内容不同的页面错误地合并。
+    """
+
+    def __init__(self, db: Session, storage_service: StorageService):
+        self.db = db
+        self.storage_service = storage_service
+        # 哈希计算和像素比对与渲染共用进程级线程池
+        self.executor = get_runtime().executor
+        # 当前flipbook内已上传的页面 (感知哈希, 本地文件, URL)，用于近似匹配
+        self._seen: List[Tuple[int, str, str]] = []
+        self.reused = 0
+
+    async def store_page(self, page_path: str) -> str:
+        """存储页面图片并返回URL，命中已有对象时跳过上传"""
+        loop = asyncio.get_event_loop()
+        content_hash, phash = await loop.run_in_executor(self.executor, self._fingerprint, page_path)
+
+        url = self._find_existing(content_hash)
+        if url is None and phash is not None:
+            url = await loop.run_in_executor(self.executor, self._find_similar, page_path, phash)
+        if url:
+            self.reused += 1
+            return url
+
+        # key带随机后缀：清理任务删除旧对象时不会误删之后重新上传的相同内容
+        object_key = f"pages/{content_hash[:2]}/{content_hash}-{uuid.uuid4().hex[:8]}.png"
+        url = await self.storage_service.upload_file(page_path, object_key, "image/png")
+        url = await self._register(content_hash, object_key, url, os.path.getsize(page_path))
+        if phash is not None:
+            self._seen.append((phash, page_path, url))
+        return url
+
+    def _fingerprint(self, page_path: str) -> Tuple[str, Optional[int]]:
+        """计算内容哈希和（可选的）感知哈希"""
+        sha256 = hashlib.sha256()
+        with open(page_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+
+        phash = None
+        if settings.PAGE_PHASH_ENABLED:
+            from PIL import Image  # 仅在worker中用到，避免API进程加载Pillow
+            with Image.open(page_path) as img:
+                phash = self._dhash(img)
+        return sha256.hexdigest(), phash
+
+    @staticmethod
+    def _dhash(img, size: int = 8) -> int:
+        """差值哈希：灰度缩放到(size+1)xsize后比较相邻像素"""
+        from PIL import Image
+        small = img.convert("L").resize((size + 1, size), Image.Resampling.BILINEAR)
+        pixels = list(small.getdata())
+        bits = 0
+        for row in range(size):
+            for col in range(size):
+                left = pixels[row * (size + 1) + col]
+                right = pixels[row * (size + 1) + col + 1]
+                bits = (bits << 1) | (left > right)
+        return bits
+
+    def _find_existing(self, content_hash: str) -> Optional[str]:
+        """全局按内容哈希精确匹配
+
+        命中时先刷新 last_used_at，清理任务只删除宽限期内未被使用的对象；
+        刷新时记录已被清理任务删除则按未命中处理，重新上传。
+        """
+        touched = self.db.query(PageObject).filter(
+            PageObject.content_hash == content_hash
+        ).update({PageObject.last_used_at: func.now()}, synchronize_session=False)
+        self.db.commit()
+        if not touched:
+            return None
+
+        existing = self.db.query(PageObject).filter(PageObject.content_hash == content_hash).first()
+        return existing.url if existing else None
+
+    def _find_similar(self, page_path: str, phash: int) -> Optional[str]:
+        """当前flipbook内的近似匹配：感知哈希只用于筛选候选，逐像素比对通过才复用"""
+        for seen_hash, seen_path, seen_url in self._seen:
+            if bin(seen_hash ^ phash).count("1") > settings.PAGE_PHASH_MAX_DISTANCE:
+                continue
+            if self._pixels_match(page_path, seen_path):
+                return seen_url
+        return None
+
+    @staticmethod
+    def _pixels_match(path_a: str, path_b: str) -> bool:
+        """两张图片尺寸相同且每个像素每个通道的差值都不超过容差"""
+        from PIL import Image, ImageChops
+        with Image.open(path_a) as a, Image.open(path_b) as b:
+            if a.size != b.size:
+                return False
+            diff = ImageChops.difference(a.convert("RGB"), b.convert("RGB"))
+            return max(high for _, high in diff.getextrema()) <= settings.PAGE_PIXEL_TOLERANCE
+
+    async def _register(self, content_hash: str, object_key: str, url: str, size: int) -> str:
+        """登记新对象到全局索引并返回应使用的URL，并发写入同一哈希时以先写入者为准"""
+        for _ in range(REGISTER_ATTEMPTS):
+            try:
+                self.db.add(PageObject(
+                    content_hash=content_hash,
+                    object_key=object_key,
+                    url=url,
+                    size=size
+                ))
+                self.db.commit()
+                return url
+            except IntegrityError:
+                # 另一个worker已登记相同内容：改用它的对象，删除本次上传的副本
+                self.db.rollback()
+                logger.debug(f"Page object {content_hash} already registered")
+
+            existing = self._find_existing(content_hash)
+            if existing is None:
+                # 先登记的记录随即被清理，重新登记本次上传的对象
+                continue
+            try:
+                await self.storage_service.delete_file(object_key)
+            except Exception:
+                # 删除失败只留下孤立对象，不影响本次转换
+                pass
+            return existing
+
+        raise RuntimeError(f"Failed to register page object {content_hash} after {REGISTER_ATTEMPTS} attempts")
@@ -1,226 +1,176 @@
 import os
+import hashlib
 import tempfile
 import asyncio
-from typing import List, Tuple, Optional
-from PIL import Image
-import fitz  # PyMuPDF
-from pptx import Presentation
-import docx
-import pdfkit
+import threading
+from contextlib import aclosing
+from typing import AsyncIterator, List, Tuple, Optional, Dict, Callable, Awaitable, Set
 import logging
-from concurrent.futures import ThreadPoolExecutor
 
-from app.core.config import settings
-from app.services.storage_service import StorageService
+from app.converters.registry import Converter, RenderedPage, get_converter
+from app.core.runtime import get_runtime
 
 logger = logging.getLogger(__name__)
 
+# 渲染最多领先上传的页数，限制临时目录中待上传的页面
+RENDER_AHEAD_PAGES = 2
+
+_DONE = object()
+
 class FileProcessor:
     def __init__(self):
-        self.storage_service = StorageService()
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        # 线程池和存储客户端由进程级运行时持有，所有转换共用
+        runtime = get_runtime()
+        self.storage_service = runtime.storage
+        self.executor = runtime.executor
 
-    async def process_file(self, task_id: str, file_path: str, file_type: str) -> List[Tuple[int, str]]:
-        """处理文件并返回页面URL列表"""
+    async def process_file(
+        self,
+        task_id: str,
+        file_path: str,
+        file_type: str,
+        completed_pages: Optional[Dict[int, str]] = None,
+        on_page_uploaded: Optional[Callable[[int, str, int], Awaitable[None]]] = None,
+        deduplicator=None,
+        output_format: str = "pages"
+    ) -> List[Tuple[int, str]]:
+        """处理文件并返回页面URL列表
+
+        转换器逐页渲染，每渲染完一页立即上传，不必等整个文件渲染完成。
+        completed_pages 为上次执行已上传的页面（页码 -> URL），这些页面不再渲染和上传；
+        每上传完一页会调用 on_page_uploaded(页码, URL, 总页数) 记录断点。
+        传入 deduplicator (PageDedupService) 时按内容哈希存储页面，重复页面复用已有对象。
+        output_format 为 bundle 时所有页面写入一个对象，返回 (页码, URL, 偏移, 长度)。
+        """
+        completed_pages = completed_pages or {}
+        skip_pages = set(completed_pages)
         try:
             with tempfile.TemporaryDirectory() as temp_dir:
                 logger.info(f"Processing file for task {task_id}, type: {file_type}")
-                
-                # 根据文件类型处理
-                if file_type == "application/pdf":
-                    pages = await self._process_pdf(file_path, temp_dir)
-                elif file_type in ["application/vnd.ms-powerpoint", 
-                                   "application/vnd.openxmlformats-officedocument.presentationml.presentation"]:
-                    pages = await self._process_ppt(file_path, temp_dir)
-                elif file_type in ["application/msword",
-                                   "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
-                    pages = await self._process_word(file_path, temp_dir)
-                elif file_type in ["image/jpeg", "image/png"]:
-                    pages = await self._process_image(file_path, temp_dir)
-                else:
-                    raise ValueError(f"Unsupported file type: {file_type}")
-                
-                # 上传页面图片
-                page_urls = []
-                for page_num, page_path in pages:
-                    object_key = f"flipbooks/{task_id}/page_{page_num}.png"
-                    url = await self.storage_service.upload_file(
-                        page_path, 
-                        object_key, 
-                        "image/png"
-                    )
-                    page_urls.append((page_num, url))
+                if skip_pages:
+                    logger.info(f"Resuming task {task_id}, {len(skip_pages)} pages already uploaded")
+                
+                # 根据文件类型选择转换器（首次使用时才导入对应的渲染库）
+                converter = get_converter(file_type)
+                async with aclosing(self._render_pages(converter, file_path, temp_dir, skip_pages)) as pages:
+                    if output_format == "bundle":
+                        rendered = [(page_num, page_path) async for page_num, page_path, _ in pages]
+                        page_urls = await self._upload_bundle(task_id, rendered, temp_dir)
+                        logger.info(f"Bundled {len(page_urls)} pages for task {task_id}")
+                        return page_urls
+                    
+                    # 上传页面图片（对象key固定，已完成的页面直接复用）
+                    page_urls = []
+                    async for page_num, page_path, total in pages:
+                        if page_num in completed_pages:
+                            page_urls.append((page_num, completed_pages[page_num]))
+                            continue
+                        
+                        if deduplicator:
+                            url = await deduplicator.store_page(page_path)
+                        else:
+                            object_key = f"flipbooks/{task_id}/page_{page_num}.png"
+                            url = await self.storage_service.upload_file(
+                                page_path, 
+                                object_key, 
+                                "image/png"
+                            )
+                        page_urls.append((page_num, url))
+                        
+                        if on_page_uploaded:
+                            await on_page_uploaded(page_num, url, total)
                 
                 logger.info(f"Processed {len(page_urls)} pages for task {task_id}")
+                if deduplicator and deduplicator.reused:
+                    logger.info(f"Reused {deduplicator.reused} stored pages for task {task_id}")
                 return page_urls
                 
         except Exception as e:
             logger.error(f"Error processing file for task {task_id}: {e}")
             raise
 
-    async def _process_pdf(self, pdf_path: str, temp_dir: str) -> List[Tuple[int, str]]:
-        """处理PDF文件"""
-        def process_pdf_sync():
-            doc = fitz.open(pdf_path)
-            pages = []
-            
-            for page_num in range(doc.page_count):
-                page = doc[page_num]
-                # 设置高分辨率
-                mat = fitz.Matrix(settings.PDF_DPI / 72, settings.PDF_DPI / 72)
-                pix = page.get_pixmap(matrix=mat)
-                
-                # 保存为PNG
-                img_path = os.path.join(temp_dir, f"page_{page_num + 1}.png")
-                pix.save(img_path)
-                
-                # 优化图片尺寸
-                optimized_path =  self._optimize_image_sync(img_path, temp_dir, page_num + 1)
-                pages.append((page_num + 1, optimized_path))
-            
-            doc.close()
-            return pages
-        
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, process_pdf_sync)
+    async def _render_pages(
+        self,
+        converter: Converter,
+        file_path: str,
+        temp_dir: str,
+        skip_pages: Set[int]
+    ) -> AsyncIterator[RenderedPage]:
+        """在渲染线程中逐页执行转换器，渲染好的页面经有界队列交给事件循环
 
-    async def _process_ppt(self, ppt_path: str, temp_dir: str) -> List[Tuple[int, str]]:
-        """处理PPT文件"""
-        def process_ppt_sync():
-            try:
-                # 使用LibreOffice将PPT转为PDF，然后转图片
-                pdf_path = os.path.join(temp_dir, "temp.pdf")
-                
-                # 这里需要LibreOffice headless模式
-                # 简化实现：创建占位图片
-                prs = Presentation(ppt_path)
-                pages = []
-                
-                for i, slide in enumerate(prs.slides):
-                    # 创建占位图片（实际项目中需要真正渲染幻灯片）
-                    img = Image.new('RGB', (1920, 1080), 'white')
-                    img_path = os.path.join(temp_dir, f"slide_{i + 1}.png")
-                    img.save(img_path)
-                    pages.append((i + 1, img_path))
-                
-                return pages
-            except Exception as e:
-                logger.error(f"PPT processing error: {e}")
-                return []
-        
+        整个文件在同一个线程中渲染（渲染库不支持跨线程共享文档）；
+        上传跟不上时渲染线程阻塞等待，调用方提前退出时渲染线程随之停止。
+        """
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, process_ppt_sync)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=RENDER_AHEAD_PAGES)
+        stop = threading.Event()
 
-    async def _process_word(self, word_path: str, temp_dir: str) -> List[Tuple[int, str]]:
-        """处理Word文件"""
-        def process_word_sync():
-            try:
-                # 读取Word文档内容
-                doc = docx.Document(word_path)
-                text_content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-                safe_text = text_content.replace('\n', '<br>')
-                # 转为HTML
-                html_content = f"""
-                <html>
-                <head>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }}
-                        p {{ margin-bottom: 10px; }}
-                    </style>
-                </head>
-                <body>
-                    {safe_text}
-                </body>
-                </html>
-                """
-                
-                # HTML转PDF
-                pdf_path = os.path.join(temp_dir, "temp.pdf")
-                pdfkit.from_string(html_content, pdf_path)
-                
-                # PDF转图片
-                return self._pdf_to_images_sync(pdf_path, temp_dir)
-                
-            except Exception as e:
-                logger.error(f"Word processing error: {e}")
-                return []
-        
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, process_word_sync)
+        def put(item):
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
 
-    async def _process_image(self, image_path: str, temp_dir: str) -> List[Tuple[int, str]]:
-        """处理单张图片"""
-        def process_image_sync():
+        def render_sync():
+            pages = iter(converter(file_path, temp_dir, skip_pages))
             try:
-                img = Image.open(image_path)
-                
-                # 调整尺寸
-                img.thumbnail((settings.IMAGE_MAX_WIDTH, settings.IMAGE_MAX_HEIGHT), Image.Resampling.LANCZOS)
-                
-                # 保存优化后的图片
-                output_path = os.path.join(temp_dir, "page_1.png")
-                img.save(output_path, "PNG", quality=settings.IMAGE_QUALITY, optimize=True)
-                
-                return [(1, output_path)]
+                for page in pages:
+                    if stop.is_set():
+                        return
+                    put(page)
             except Exception as e:
-                logger.error(f"Image processing error: {e}")
-                return []
-        
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, process_image_sync)
+                put(e)
+                return
+            finally:
+                # 提前停止时关闭生成器，释放打开的文档
+                close = getattr(pages, "close", None)
+                if close:
+                    close()
+            put(_DONE)
 
-    def _pdf_to_images_sync(self, pdf_path: str, temp_dir: str) -> List[Tuple[int, str]]:
-        """同步版本PDF转图片"""
-        doc = fitz.open(pdf_path)
-        pages = []
-        
-        for page_num in range(doc.page_count):
-            page = doc[page_num]
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            
-            img_path = os.path.join(temp_dir, f"page_{page_num + 1}.png")
-            pix.save(img_path)
-            pages.append((page_num + 1, img_path))
-        
-        doc.close()
-        return pages
+        producer = loop.run_in_executor(self.executor, render_sync)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # 取走队列中剩余的页面，让阻塞在put上的渲染线程退出
+            stop.set()
+            while not producer.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
 
-    async def _optimize_image(self, image_path: str, temp_dir: str, page_num: int) -> str:
-        """优化图片尺寸和质量"""
-        def optimize_sync():
-            try:
-                img = Image.open(image_path)
-                
-                # 调整尺寸但保持宽高比
-                img.thumbnail((settings.IMAGE_MAX_WIDTH, settings.IMAGE_MAX_HEIGHT), Image.Resampling.LANCZOS)
-                
-                # 保存优化后的图片
-                optimized_path = os.path.join(temp_dir, f"optimized_page_{page_num}.png")
-                img.save(optimized_path, "PNG", quality=settings.IMAGE_QUALITY, optimize=True)
-                
-                return optimized_path
-            except Exception as e:
-                logger.error(f"Image optimization error: {e}")
-                return image_path  # 返回原图片路径
+    async def _upload_bundle(self, task_id: str, pages: List[Tuple[int, str]], temp_dir: str) -> List[Tuple[int, str, int, int]]:
+        """将所有页面拼接为一个bundle对象上传，相同内容的页面共用同一字节范围"""
+        def build_bundle_sync():
+            bundle_path = os.path.join(temp_dir, "pages.bundle")
+            index = []
+            ranges = {}
+            offset = 0
+            
+            with open(bundle_path, "wb") as bundle:
+                for page_num, page_path in pages:
+                    with open(page_path, "rb") as f:
+                        data = f.read()
+                    digest = hashlib.sha256(data).digest()
+                    if digest not in ranges:
+                        bundle.write(data)
+                        ranges[digest] = (offset, len(data))
+                        offset += len(data)
+                    index.append((page_num, *ranges[digest]))
+            
+            return bundle_path, index
         
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, optimize_sync)
-
-
-    def _optimize_image_sync(self, image_path: str, temp_dir: str, page_num: int) -> str:
-        """同步函数：实际执行图像优化"""
-        try:
-            img = Image.open(image_path)
-
-            # 调整尺寸但保持宽高比
-            img.thumbnail((settings.IMAGE_MAX_WIDTH, settings.IMAGE_MAX_HEIGHT), Image.Resampling.LANCZOS)
-
-            # 保存优化后的图片
-            optimized_path = os.path.join(temp_dir, f"optimized_page_{page_num}.png")
-            img.save(optimized_path, "PNG", quality=settings.IMAGE_QUALITY, optimize=True)
-
-            return optimized_path
-        except Exception as e:
-            logger.error(f"Image optimization error: {e}")
-            return image_path  # 返回原图片路径
\ No newline at end of file
+        bundle_path, index = await loop.run_in_executor(self.executor, build_bundle_sync)
+        
+        url = await self.storage_service.upload_file(
+            bundle_path,
+            f"flipbooks/{task_id}/pages.bundle",
+            "application/octet-stream"
+        )
+        return [(page_num, url, offset, length) for page_num, offset, length in index]
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from sqlalchemy import exists, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.runtime import get_runtime
+from app.models.database import Task, Page, PageObject
+from app.services.storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+class RetentionService:
+    """过期flipbook清理：按状态规则分批删除存储对象和数据库记录
+
+    每批按主键顺序取 RETENTION_BATCH_SIZE 个任务，先批量删除对象再删除记录并提交，
+    单个事务只涉及一批记录，不会长时间锁表；存储请求期间不持有数据库事务。
+    """
+
+    def __init__(self, db: Session, storage_service: Optional[StorageService] = None):
+        self.db = db
+        self.storage_service = storage_service or get_runtime().storage
+
+    async def purge_expired(self) -> Dict[str, int]:
+        """执行全部清理规则，返回删除数量统计"""
+        stats = {"tasks": 0, "pages": 0, "objects": 0, "page_objects": 0}
+        now = datetime.utcnow()
+
+        for status, max_age in self._rules():
+            await self._purge_tasks(status, now - max_age, stats)
+
+        grace = timedelta(hours=settings.RETENTION_PAGE_OBJECT_GRACE_HOURS)
+        await self._purge_page_objects(now - grace, stats)
+
+        logger.info(f"Retention purge finished: {stats}")
+        return stats
+
+    def _rules(self) -> List[tuple]:
+        """状态 -> 保留时长，配置为0表示不清理该状态"""
+        rules = []
+        if settings.RETENTION_COMPLETED_DAYS > 0:
+            rules.append(("completed", timedelta(days=settings.RETENTION_COMPLETED_DAYS)))
+        if settings.RETENTION_FAILED_HOURS > 0:
+            rules.append(("failed", timedelta(hours=settings.RETENTION_FAILED_HOURS)))
+        if settings.RETENTION_UPLOADING_HOURS > 0:
+            rules.append(("uploading", timedelta(hours=settings.RETENTION_UPLOADING_HOURS)))
+            # 合并分片时进程退出遗留的任务
+            rules.append(("completing", timedelta(hours=settings.RETENTION_UPLOADING_HOURS)))
+        return rules
+
+    async def _purge_tasks(self, status: str, cutoff: datetime, stats: Dict[str, int]):
+        """分批删除最后活动时间早于cutoff的任务"""
+        last_activity = func.coalesce(Task.updated_at, Task.created_at)
+        last_id = ""
+
+        while True:
+            rows = self.db.query(Task.id, Task.file_key, Task.upload_id).filter(
+                Task.status == status,
+                last_activity < cutoff,
+                Task.id > last_id
+            ).order_by(Task.id).limit(settings.RETENTION_BATCH_SIZE).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            # 结束读事务，存储请求期间不持有数据库事务
+            self.db.commit()
+
+            # 并发列出每个任务的对象，请求数由存储客户端的线程池和连接池限制
+            task_keys = await asyncio.gather(*(
+                self._task_keys(task_id, file_key, upload_id) for task_id, file_key, upload_id in rows
+            ))
+            keys_by_task: Dict[str, Set[str]] = {row.id: keys for row, keys in zip(rows, task_keys)}
+
+            all_keys = [key for keys in keys_by_task.values() for key in keys]
+            failed = set(await self.storage_service.delete_files(all_keys))
+
+            # 对象删除失败的任务保留记录，下次清理时重试
+            task_ids = [task_id for task_id, keys in keys_by_task.items() if not keys & failed]
+            if task_ids:
+                stats["pages"] += self.db.query(Page).filter(
+                    Page.task_id.in_(task_ids)
+                ).delete(synchronize_session=False)
+                stats["tasks"] += self.db.query(Task).filter(
+                    Task.id.in_(task_ids)
+                ).delete(synchronize_session=False)
+                self.db.commit()
+
+            stats["objects"] += len(all_keys) - len(failed)
+            logger.info(f"Purged {len(task_ids)} {status} tasks (last id {last_id})")
+
+    async def _task_keys(self, task_id: str, file_key: str, upload_id: Optional[str]) -> Set[str]:
+        """任务的上传原文件和页面/bundle对象，未完成的直传先取消分片上传"""
+        if upload_id:
+            # 释放已上传的分片
+            try:
+                await self.storage_service.abort_multipart_upload(file_key, upload_id)
+            except Exception:
+                pass
+        uploads, outputs = await asyncio.gather(
+            self.storage_service.list_files(f"uploads/{task_id}/"),
+            self.storage_service.list_files(f"flipbooks/{task_id}/")
+        )
+        return {file_key, *uploads, *outputs}
+
+    async def _purge_page_objects(self, cutoff: datetime, stats: Dict[str, int]):
+        """删除已没有页面引用的共享页面对象
+
+        先删除索引记录再删除对象：去重查询不会再命中这些对象，
+        对象删除失败只会留下孤立对象，不会产生失效的页面URL。
+        宽限期按最后一次去重命中时间计算，命中的页面可能还没写入页面记录；
+        DELETE语句中重新检查引用和使用时间，查询之后才被命中的对象不会被删除。
+        """
+        referenced = exists().where(Page.image_url == PageObject.url)
+        last_used = func.coalesce(PageObject.last_used_at, PageObject.created_at)
+        last_hash = ""
+
+        while True:
+            rows = self.db.query(PageObject.content_hash, PageObject.object_key).filter(
+                ~referenced,
+                last_used < cutoff,
+                PageObject.content_hash > last_hash
+            ).order_by(PageObject.content_hash).limit(settings.RETENTION_BATCH_SIZE).all()
+            if not rows:
+                break
+            last_hash = rows[-1].content_hash
+
+            hashes = [content_hash for content_hash, _ in rows]
+            self.db.query(PageObject).filter(
+                PageObject.content_hash.in_(hashes),
+                ~referenced,
+                last_used < cutoff
+            ).delete(synchronize_session=False)
+            kept = {
+                content_hash for content_hash, in self.db.query(PageObject.content_hash).filter(
+                    PageObject.content_hash.in_(hashes)
+                )
+            }
+            self.db.commit()
+
+            keys = [object_key for content_hash, object_key in rows if content_hash not in kept]
+            stats["page_objects"] += len(keys)
+            failed = await self.storage_service.delete_files(keys)
+            stats["objects"] += len(keys) - len(failed)
@@ -1,13 +1,17 @@
 import boto3
+from botocore.config import Config
 import aiofiles
 import os
 import asyncio
-from typing import Optional
+from typing import Optional, List
 from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# S3/R2 DeleteObjects 单次请求最多1000个key
+DELETE_BATCH_SIZE = 1000
+
 class StorageService:
     def __init__(self):
         self.s3_client = boto3.client(
@@ -15,10 +19,16 @@ class StorageService:
             endpoint_url=settings.R2_ENDPOINT_URL,
             aws_access_key_id=settings.R2_ACCESS_KEY_ID,
             aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-            region_name='auto'
+            region_name='auto',
+            # 客户端在进程内共享（见 app.core.runtime），连接池需覆盖并发上传
+            config=Config(max_pool_connections=settings.STORAGE_MAX_POOL_CONNECTIONS)
         )
         self.bucket_name = settings.R2_BUCKET_NAME
 
+    def close(self):
+        """关闭客户端连接池"""
+        self.s3_client.close()
+
     async def upload_file(self, file_path: str, object_key: str, content_type: str = None) -> str:
         """上传文件到R2存储"""
         try:
@@ -87,10 +97,112 @@ class StorageService:
             loop = asyncio.get_event_loop()
             await loop.run_in_executor(
                 None,
-                self.s3_client.delete_object,
-                Bucket=self.bucket_name,
-                Key=object_key
+                lambda: self.s3_client.delete_object(Bucket=self.bucket_name, Key=object_key)
             )
         except Exception as e:
             logger.error(f"Failed to delete file {object_key}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def list_files(self, prefix: str) -> List[str]:
+        """列出前缀下的所有对象key"""
+        def list_sync():
+            keys = []
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                keys.extend(obj['Key'] for obj in page.get('Contents', []))
+            return keys
+
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, list_sync)
+        except Exception as e:
+            logger.error(f"Failed to list files under {prefix}: {e}")
+            raise
+
+    async def delete_files(self, object_keys: List[str]) -> List[str]:
+        """批量删除文件，每次DeleteObjects请求最多1000个key，返回删除失败的key"""
+        def delete_sync():
+            failed = []
+            for start in range(0, len(object_keys), DELETE_BATCH_SIZE):
+                batch = object_keys[start:start + DELETE_BATCH_SIZE]
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+                for error in response.get('Errors', []):
+                    logger.error(f"Failed to delete file {error['Key']}: {error.get('Message')}")
+                    failed.append(error['Key'])
+            return failed
+
+        if not object_keys:
+            return []
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, delete_sync)
+
+    async def create_multipart_upload(self, object_key: str, content_type: str = None) -> str:
+        """创建分片上传，返回upload_id"""
+        extra_args = {}
+        if content_type:
+            extra_args['ContentType'] = content_type
+
+        try:
+            loop = asyncio.get_event_loop()
+            response = await loop.run_in_executor(
+                None,
+                lambda: self.s3_client.create_multipart_upload(
+                    Bucket=self.bucket_name, Key=object_key, **extra_args
+                )
+            )
+            return response['UploadId']
+        except Exception as e:
+            logger.error(f"Failed to create multipart upload {object_key}: {e}")
+            raise
+
+    def presign_upload_part(self, object_key: str, upload_id: str, part_number: int, expires_in: int) -> str:
+        """生成分片上传的预签名URL（本地签名，不发起网络请求）"""
+        return self.s3_client.generate_presigned_url(
+            'upload_part',
+            Params={
+                'Bucket': self.bucket_name,
+                'Key': object_key,
+                'UploadId': upload_id,
+                'PartNumber': part_number
+            },
+            ExpiresIn=expires_in
+        )
+
+    async def complete_multipart_upload(self, object_key: str, upload_id: str, parts: List[dict]) -> int:
+        """合并分片，parts为 [{'PartNumber': n, 'ETag': etag}]，返回对象大小"""
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None,
+                lambda: self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+            )
+            response = await loop.run_in_executor(
+                None,
+                lambda: self.s3_client.head_object(Bucket=self.bucket_name, Key=object_key)
+            )
+            return response['ContentLength']
+        except Exception as e:
+            logger.error(f"Failed to complete multipart upload {object_key}: {e}")
+            raise
+
+    async def abort_multipart_upload(self, object_key: str, upload_id: str):
+        """取消分片上传，释放已上传的分片"""
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None,
+                lambda: self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name, Key=object_key, UploadId=upload_id
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to abort multipart upload {object_key}: {e}")
+            raise
@@ -1,6 +1,7 @@
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from typing import List, Optional, Dict
+from datetime import datetime, timedelta
 
 from app.models.database import Task, Page
 from app.schemas.task import TaskCreate, TaskResponse, TaskStatus
@@ -18,7 +19,8 @@ class TaskService:
             file_key=task_data.file_key,
             file_type=task_data.file_type,
             file_size=task_data.file_size,
-            status="uploaded"
+            status=task_data.status,
+            upload_id=task_data.upload_id
         )
         
         self.db.add(task)
@@ -50,17 +52,25 @@ class TaskService:
         return None
 
     def add_pages(self, task_id: str, pages_data: List[tuple]):
-        """添加页面数据"""
+        """添加页面数据（已通过断点保存的页面会被跳过）"""
         task = self.get_task(task_id)
         if not task:
             return False
         
-        for page_num, page_url in pages_data:
+        existing = self.get_completed_pages(task_id)
+        for page_data in pages_data:
+            # 打包格式为 (页码, bundle URL, 偏移, 长度)
+            page_num, page_url = page_data[:2]
+            if page_num in existing:
+                continue
             page = Page(
                 task_id=task_id,
                 page_number=page_num,
                 image_url=page_url
             )
+            if len(page_data) == 4:
+                page.byte_offset, page.byte_length = page_data[2:]
+                task.bundle_url = page_url
             self.db.add(page)
         
         # 更新任务的总页数
@@ -69,6 +79,135 @@ class TaskService:
         self.db.commit()
         return True
 
+    def claim_upload(self, task_id: str, upload_id: str) -> bool:
+        """认领直传完成：上传中 -> 合并中
+
+        条件更新保证同一个分片上传只会被一个完成请求认领，重复或并发的请求返回False。
+        """
+        count = self.db.query(Task).filter(
+            Task.id == task_id,
+            Task.status == "uploading",
+            Task.upload_id == upload_id
+        ).update({Task.status: "completing", Task.updated_at: datetime.utcnow()}, synchronize_session=False)
+        self.db.commit()
+        return bool(count)
+
+    def release_upload(self, task_id: str):
+        """合并分片失败：退回上传中，客户端可以重新提交完成请求"""
+        self.db.query(Task).filter(
+            Task.id == task_id,
+            Task.status == "completing"
+        ).update({Task.status: "uploading", Task.updated_at: datetime.utcnow()}, synchronize_session=False)
+        self.db.commit()
+
+    def mark_uploaded(self, task_id: str, file_size: int) -> Optional[Task]:
+        """直传完成：记录实际文件大小并清除分片上传ID"""
+        task = self.get_task(task_id)
+        if not task:
+            return None
+        
+        task.status = "uploaded"
+        task.file_size = file_size
+        task.upload_id = None
+        task.updated_at = datetime.utcnow()
+        self.db.commit()
+        return task
+
+    def get_completed_pages(self, task_id: str) -> Dict[int, str]:
+        """获取已上传完成的页面（页码 -> URL），用于断点续转"""
+        rows = self.db.query(Page.page_number, Page.image_url).filter(
+            Page.task_id == task_id
+        ).all()
+        return {page_number: image_url for page_number, image_url in rows}
+
+    def save_page_checkpoint(self, task_id: str, page_num: int, page_url: str, progress: int):
+        """保存单页断点，同时刷新任务进度和租约时间"""
+        exists = self.db.query(Page.id).filter(
+            Page.task_id == task_id,
+            Page.page_number == page_num
+        ).first()
+        if not exists:
+            self.db.add(Page(task_id=task_id, page_number=page_num, image_url=page_url))
+        
+        self.db.query(Task).filter(Task.id == task_id).update(
+            {Task.progress: progress, Task.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        self.db.commit()
+
+    def refresh_lease(self, task_id: str) -> bool:
+        """刷新处理中任务的租约时间，任务已不在处理中时返回False"""
+        count = self.db.query(Task).filter(
+            Task.id == task_id,
+            Task.status == "processing"
+        ).update({Task.updated_at: datetime.utcnow()}, synchronize_session=False)
+        self.db.commit()
+        return bool(count)
+
+    def start_attempt(self, task_id: str, lease_timeout: int) -> bool:
+        """认领一次转换：状态置为处理中并累加执行次数
+
+        只有等待转换、失败或租约已过期的任务可以认领。条件更新保证同一任务同时只有一次转换，
+        重复投递的消息、重复点击的重试和清扫重新排队的任务相互竞争时只有一个返回True。
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=lease_timeout)
+        count = self.db.query(Task).filter(
+            Task.id == task_id,
+            or_(
+                Task.status.in_(("uploaded", "failed")),
+                and_(Task.status == "processing", Task.updated_at < cutoff)
+            )
+        ).update({
+            Task.status: "processing",
+            Task.attempts: func.coalesce(Task.attempts, 0) + 1,
+            Task.error_message: None,
+            Task.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        self.db.commit()
+        return bool(count)
+
+    def requeue_task(self, task_id: str) -> bool:
+        """手动重新排队失败的任务：重置执行次数，保留已完成的页面断点
+
+        条件更新保证重复提交的重试只有一次生效，任务不是失败状态时返回False。
+        """
+        count = self.db.query(Task).filter(
+            Task.id == task_id,
+            Task.status == "failed"
+        ).update({
+            Task.status: "uploaded",
+            Task.attempts: 0,
+            Task.error_message: None,
+            Task.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        self.db.commit()
+        return bool(count)
+
+    def claim_stale_tasks(self, lease_timeout: int) -> List[Task]:
+        """认领租约超时的任务：处理中的任务（worker崩溃遗留）和长时间未开始的任务（派发丢失）
+
+        认领后任务重新置为等待转换，由调用方重新派发，start_attempt 保证重复派发只执行一次。
+        通过条件更新刷新时间，多个进程同时扫描时每个任务只会被一个进程认领。
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=lease_timeout)
+        candidates = self.db.query(Task).filter(
+            Task.status.in_(("processing", "uploaded")),
+            Task.updated_at < cutoff
+        ).all()
+        
+        claimed = []
+        for task in candidates:
+            count = self.db.query(Task).filter(
+                Task.id == task.id,
+                Task.status.in_(("processing", "uploaded")),
+                Task.updated_at < cutoff
+            ).update({Task.status: "uploaded", Task.updated_at: datetime.utcnow()}, synchronize_session=False)
+            if count:
+                claimed.append(task)
+        
+        self.db.commit()
+        return claimed
+
     def get_task_status(self, task_id: str) -> Optional[TaskStatus]:
         """获取任务状态"""
         task = self.get_task(task_id)
@@ -105,7 +244,9 @@ class TaskService:
             FlipbookPage(
                 page=page.page_number,
                 url=page.image_url,
-                thumbnailUrl=page.thumbnail_url
+                thumbnailUrl=page.thumbnail_url,
+                byteOffset=page.byte_offset,
+                byteLength=page.byte_length
             ) for page in pages
         ]
         
@@ -114,5 +255,7 @@ class TaskService:
             title=task.original_name,
             totalPages=task.total_pages,
             pages=flipbook_pages,
+            format="bundle" if task.bundle_url else "pages",
+            bundleUrl=task.bundle_url,
             createdAt=task.created_at.isoformat()
         )
\ No newline at end of file
@@ -1,6 +1,14 @@
 from celery import Celery
+from celery.schedules import crontab
+import logging
+from celery.signals import worker_init, worker_ready, worker_process_init, worker_process_shutdown
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# 转换在事件循环中执行，且渲染依赖阻塞的线程池，协程式并发池会让多个任务共用同一线程的事件循环
+UNSUPPORTED_POOLS = ("gevent", "eventlet")
+
 # Celery配置 (Mock标记 - 需要在部署时配置真实的Redis)
 celery_app = Celery(
     "flipbook_converter",
@@ -14,42 +22,106 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # worker崩溃时消息重新投递，配合页面断点从中断处继续
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # 定时任务（需启动 celery beat）
+    beat_schedule={
+        "purge-expired-flipbooks": {
+            "task": "app.tasks.celery_tasks.purge_expired_flipbooks",
+            "schedule": crontab(hour=3, minute=0),
+        },
+        "requeue-stale-tasks": {
+            "task": "app.tasks.celery_tasks.requeue_stale_conversions",
+            "schedule": settings.TASK_SWEEP_INTERVAL,
+        },
+    },
 )
 
-@celery_app.task
-def process_file_task(task_id: str, file_path: str, file_type: str):
-    """Celery任务：异步处理文件"""
-    import asyncio
-    from app.core.database import SessionLocal
-    from app.services.task_service import TaskService
-    from app.services.file_processor import FileProcessor
+@celery_app.task(bind=True, max_retries=settings.TASK_MAX_ATTEMPTS - 1, default_retry_delay=30)
+def process_file_task(self, task_id: str, file_path: str = None, file_type: str = None):
+    """Celery任务：异步处理文件（重试时跳过已上传的页面）"""
+    from app.core.runtime import get_runtime
+    from app.services.conversion_service import ConversionService
     
-    db = SessionLocal()
+    runtime = get_runtime()
+    db = runtime.session_factory()
     try:
-        task_service = TaskService(db)
-        file_processor = FileProcessor()
-        
-        # 更新状态
-        task_service.update_task_status(task_id, "processing", 10)
-        
-        # 处理文件
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        pages = loop.run_until_complete(
-            file_processor.process_file(task_id, file_path, file_type)
+        # 处理文件（复用进程级事件循环、线程池和存储客户端）
+        pages = runtime.run(
+            ConversionService(db).convert(task_id, file_path, file_type)
         )
         
-        # 保存页面信息
-        task_service.add_pages(task_id, pages)
-        
-        # 更新状态为完成
-        task_service.update_task_status(task_id, "completed", 100)
-        
         return {"status": "success", "pages": len(pages)}
         
     except Exception as e:
-        task_service.update_task_status(task_id, "failed", 0, str(e))
+        if self.request.retries < self.max_retries:
+            # 重试可能落到其他worker，由ConversionService从存储重新下载原文件
+            raise self.retry(exc=e, args=[task_id, None, file_type])
         return {"status": "error", "message": str(e)}
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@celery_app.task
+def purge_expired_flipbooks():
+    """Celery定时任务：清理过期的flipbook及其存储对象"""
+    from app.core.runtime import get_runtime
+    from app.services.retention_service import RetentionService
+    
+    runtime = get_runtime()
+    db = runtime.session_factory()
+    try:
+        return runtime.run(RetentionService(db, runtime.storage).purge_expired())
+    finally:
+        db.close()
+
+@celery_app.task
+def requeue_stale_conversions():
+    """Celery定时任务：重新排队租约超时的任务（worker崩溃或派发丢失）"""
+    return dispatch_stale_tasks()
+
+def dispatch_stale_tasks() -> int:
+    """认领租约超时的任务并重新派发到队列，返回派发数量"""
+    from app.core.database import SessionLocal
+    from app.services.conversion_service import ConversionService
+    
+    db = SessionLocal()
+    try:
+        stale_tasks = ConversionService(db).claim_stale_tasks()
+    finally:
+        db.close()
+    
+    for task_id, file_type in stale_tasks:
+        process_file_task.delay(task_id, None, file_type)
+    return len(stale_tasks)
+
+@worker_init.connect
+def check_worker_pool(sender=None, **kwargs):
+    """启动时拒绝不支持的并发池（prefork、threads、solo可用）"""
+    pool_cls = getattr(sender, "pool_cls", None)
+    pool_name = pool_cls if isinstance(pool_cls, str) else getattr(pool_cls, "__module__", "")
+    if any(name in (pool_name or "") for name in UNSUPPORTED_POOLS):
+        message = (
+            f"Worker pool '{pool_name}' is not supported: conversions run on a per-thread asyncio loop. "
+            f"Use --pool=prefork, threads or solo"
+        )
+        logger.critical(message)
+        # Celery会吞掉信号处理函数中的普通异常，用SystemExit中止启动
+        raise SystemExit(message)
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """每个worker子进程初始化一次运行时"""
+    from app.core.runtime import init_runtime
+    init_runtime(own_loop=True)
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """worker子进程退出时释放运行时"""
+    from app.core.runtime import shutdown_runtime
+    shutdown_runtime()
+
+@worker_ready.connect
+def requeue_stale_tasks(**kwargs):
+    """worker启动时重新排队租约超时的任务（在主进程中执行，不初始化运行时）"""
+    dispatch_stale_tasks()
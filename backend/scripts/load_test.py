@@ -0,0 +1,249 @@
+"""上传 -> 转换 -> 查看 全链路压测
+
+每个虚拟用户循环执行：POST /api/upload 上传一个样例文档，轮询 GET /api/task/{id}/status
+直到完成或失败，再 GET /api/flipbook/{id}。结束后输出各接口的 p50/p95/p99 延迟、
+端到端转换耗时和错误率；HTTP错误率或转换失败率超过阈值时以非零状态退出。
+
+用法（配合 docker-compose-loadtest.yml 启动的本地MinIO和数据库）：
+    python scripts/load_test.py --base-url http://localhost:8000 --concurrency 8 --duration 60 \
+        --mix pdf=5,jpg=2,png=1,docx=1,pptx=1
+"""
+import argparse
+import asyncio
+import io
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import httpx
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+# ---------- 样例文档 ----------
+
+def make_pdf(pages: int) -> bytes:
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Load test page {i + 1}", fontsize=24)
+        page.draw_rect(fitz.Rect(72, 120, 520, 700), color=(0.2, 0.4, 0.8), fill=(0.9, 0.9, 1))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def make_image(fmt: str, size: Tuple[int, int]) -> bytes:
+    from PIL import Image, ImageDraw
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    for x in range(0, size[0], 64):
+        draw.line([(x, 0), (size[0] - x, size[1])], fill=(x % 255, 80, 160), width=3)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG" if fmt == "jpg" else "PNG", quality=90)
+    return buf.getvalue()
+
+def make_docx(paragraphs: int) -> bytes:
+    import docx
+    doc = docx.Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Paragraph {i + 1}: " + "lorem ipsum dolor sit amet " * 20)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def make_pptx(slides: int) -> bytes:
+    from pptx import Presentation
+    prs = Presentation()
+    for i in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i + 1}"
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+def build_samples(pages: int) -> Dict[str, bytes]:
+    """生成各类型样例文档（只生成一次，所有请求复用）"""
+    return {
+        "pdf": make_pdf(pages),
+        "jpg": make_image("jpg", (4000, 3000)),
+        "png": make_image("png", (2400, 1600)),
+        "docx": make_docx(pages * 5),
+        "pptx": make_pptx(pages),
+    }
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in CONTENT_TYPES:
+            raise argparse.ArgumentTypeError(f"Unknown document type: {kind}")
+        mix[kind] = int(weight or 1)
+    return mix
+
+# ---------- 统计 ----------
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.conversions: Dict[str, List[float]] = defaultdict(list)
+        self.conversion_failures: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, elapsed: float, ok: bool):
+        self.latencies[endpoint].append(elapsed)
+        if not ok:
+            self.errors[endpoint] += 1
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法百分位"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+def format_row(name: str, values: List[float], errors: int) -> str:
+    total = len(values)
+    rate = errors / total * 100 if total else 0.0
+    return (
+        f"{name:<22}{total:>8}{rate:>9.1f}%"
+        f"{percentile(values, 50) * 1000:>11.0f}{percentile(values, 95) * 1000:>11.0f}"
+        f"{percentile(values, 99) * 1000:>11.0f}"
+    )
+
+def print_report(stats: Stats, wall_time: float):
+    header = f"{'endpoint':<22}{'requests':>8}{'errors':>10}{'p50(ms)':>11}{'p95(ms)':>11}{'p99(ms)':>11}"
+    print()
+    print(header)
+    print("-" * len(header))
+    for endpoint in sorted(stats.latencies):
+        print(format_row(endpoint, stats.latencies[endpoint], stats.errors[endpoint]))
+
+    print()
+    print(f"{'conversion (e2e)':<22}{'done':>8}{'failed':>10}{'p50(s)':>11}{'p95(s)':>11}{'p99(s)':>11}")
+    print("-" * len(header))
+    for kind in sorted(set(stats.conversions) | set(stats.conversion_failures)):
+        values = stats.conversions[kind]
+        print(
+            f"{kind:<22}{len(values):>8}{stats.conversion_failures[kind]:>10}"
+            f"{percentile(values, 50):>11.2f}{percentile(values, 95):>11.2f}{percentile(values, 99):>11.2f}"
+        )
+
+    completed = sum(len(v) for v in stats.conversions.values())
+    print()
+    print(f"wall time {wall_time:.1f}s, throughput {completed / wall_time:.2f} conversions/s")
+
+# ---------- 虚拟用户 ----------
+
+async def timed(stats: Stats, endpoint: str, request):
+    start = time.perf_counter()
+    try:
+        response = await request
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        response, ok = None, False
+    stats.record(endpoint, time.perf_counter() - start, ok)
+    return response if ok else None
+
+async def run_conversion(client: httpx.AsyncClient, stats: Stats, kind: str, payload: bytes, args) -> bool:
+    """执行一次完整的 上传 -> 轮询 -> 查看 流程"""
+    start = time.perf_counter()
+    files = {"file": (f"loadtest.{kind}", payload, CONTENT_TYPES[kind])}
+    response = await timed(stats, "POST /api/upload", client.post("/api/upload", files=files))
+    if response is None:
+        stats.conversion_failures[kind] += 1
+        return False
+    task_id = response.json()["taskId"]
+
+    deadline = start + args.timeout
+    status = None
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(args.poll_interval)
+        response = await timed(stats, "GET /api/task/status", client.get(f"/api/task/{task_id}/status"))
+        if response is None:
+            continue
+        status = response.json()["status"]
+        if status in ("completed", "failed"):
+            break
+
+    if status != "completed":
+        stats.conversion_failures[kind] += 1
+        return False
+    stats.conversions[kind].append(time.perf_counter() - start)
+
+    response = await timed(stats, "GET /api/flipbook", client.get(f"/api/flipbook/{task_id}"))
+    if response is not None and args.fetch_pages:
+        pages = response.json()["pages"]
+        if pages:
+            await timed(stats, "GET page image", client.get(pages[0]["url"]))
+    return True
+
+async def virtual_user(client, stats, samples, mix, args, stop_at):
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    while time.perf_counter() < stop_at:
+        kind = random.choices(kinds, weights)[0]
+        await run_conversion(client, stats, kind, samples[kind], args)
+
+async def main(args) -> int:
+    print(f"Building sample documents ({args.pages} pages)...")
+    samples = build_samples(args.pages)
+
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.request_timeout, limits=limits) as client:
+        response = await client.get("/health")
+        response.raise_for_status()
+
+        print(f"Running {args.concurrency} users for {args.duration}s against {args.base_url}, mix {args.mix}")
+        start = time.perf_counter()
+        stop_at = start + args.duration
+        await asyncio.gather(*[
+            virtual_user(client, stats, samples, args.mix, args, stop_at)
+            for _ in range(args.concurrency)
+        ])
+        wall_time = time.perf_counter() - start
+
+    print_report(stats, wall_time)
+
+    exit_code = 0
+    total_requests = sum(len(v) for v in stats.latencies.values())
+    total_errors = sum(stats.errors.values())
+    if total_requests and total_errors / total_requests * 100 > args.max_error_rate:
+        print(f"Error rate above {args.max_error_rate}%")
+        exit_code = 1
+
+    # 转换失败（状态为failed或超时）不一定伴随HTTP错误，单独计算失败率
+    total_failures = sum(stats.conversion_failures.values())
+    total_conversions = sum(len(v) for v in stats.conversions.values()) + total_failures
+    if total_conversions and total_failures / total_conversions * 100 > args.max_conversion_failure_rate:
+        print(f"Conversion failure rate above {args.max_conversion_failure_rate}%")
+        exit_code = 1
+    return exit_code
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flipbook converter load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发虚拟用户数")
+    parser.add_argument("--duration", type=float, default=60, help="压测时长（秒）")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("pdf=5,jpg=2,png=1,docx=1,pptx=1"),
+                        help="文档类型权重，如 pdf=5,jpg=2")
+    parser.add_argument("--pages", type=int, default=10, help="PDF/PPTX样例页数")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=300, help="单次转换超时（秒）")
+    parser.add_argument("--request-timeout", type=float, default=60)
+    parser.add_argument("--fetch-pages", action="store_true", help="同时请求第一页图片（经由存储/CDN）")
+    parser.add_argument("--max-error-rate", type=float, default=1.0, help="错误率超过该百分比时以非零状态退出")
+    parser.add_argument("--max-conversion-failure-rate", type=float, default=1.0,
+                        help="转换失败（含超时）比例超过该百分比时以非零状态退出")
+    sys.exit(asyncio.run(main(parser.parse_args())))
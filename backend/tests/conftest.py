@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+# 测试使用本地SQLite和moto模拟的存储，需要在导入app之前设置
+_db_dir = tempfile.mkdtemp(prefix="flipbook-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ["R2_ACCESS_KEY_ID"] = "testing"
+os.environ["R2_SECRET_ACCESS_KEY"] = "testing"
+os.environ["R2_PUBLIC_URL"] = "https://cdn.test"
+
+import pytest
+from moto import mock_aws
+
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+import app.models.database  # noqa: F401  注册模型
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def storage(monkeypatch):
+    from app.services.storage_service import StorageService
+
+    # 不指定endpoint，请求由moto拦截
+    monkeypatch.setattr(settings, "R2_ENDPOINT_URL", None)
+    with mock_aws():
+        service = StorageService()
+        service.s3_client.create_bucket(
+            Bucket=settings.R2_BUCKET_NAME,
+            CreateBucketConfiguration={"LocationConstraint": "auto"}
+        )
+        yield service
+        service.close()
+
+@pytest.fixture
+def runtime(storage):
+    from app.core.runtime import init_runtime, shutdown_runtime
+
+    worker_runtime = init_runtime()
+    worker_runtime.storage.close()
+    worker_runtime.storage = storage
+    yield worker_runtime
+    shutdown_runtime()
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from PIL import Image, ImageDraw
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import PageObject
+from app.services import dedup_service
+from app.services.dedup_service import PageDedupService
+
+def gradient_page(path, marker=None, shift=0):
+    """水平渐变页面，marker 在局部画一个白块（感知哈希不变、像素不同），shift 整体微调亮度"""
+    img = Image.linear_gradient("L").rotate(90).resize((256, 256)).convert("RGB")
+    if shift:
+        img = img.point(lambda value: min(value + shift, 255))
+    if marker:
+        ImageDraw.Draw(img).rectangle(marker, fill=(255, 255, 255))
+    img.save(path)
+    return str(path)
+
+def stored_pages(runtime):
+    response = runtime.storage.s3_client.list_objects_v2(Bucket=settings.R2_BUCKET_NAME, Prefix="pages/")
+    return [obj["Key"] for obj in response.get("Contents", [])]
+
+def test_identical_page_is_reused_across_flipbooks(db, runtime, tmp_path):
+    first = PageDedupService(db, runtime.storage)
+    second = PageDedupService(db, runtime.storage)
+
+    url = asyncio.run(first.store_page(gradient_page(tmp_path / "a.png")))
+    reused_url = asyncio.run(second.store_page(gradient_page(tmp_path / "b.png")))
+
+    assert reused_url == url
+    assert (first.reused, second.reused) == (0, 1)
+    assert len(stored_pages(runtime)) == 1
+    assert db.query(PageObject).count() == 1
+
+def test_concurrent_registration_uses_first_object(db, runtime, tmp_path, monkeypatch):
+    service = PageDedupService(db, runtime.storage)
+    upload_file = runtime.storage.upload_file
+
+    async def upload_racing_other_worker(path, object_key, content_type):
+        url = await upload_file(path, object_key, content_type)
+        # 另一个worker在本次上传期间登记了相同内容
+        other = SessionLocal()
+        try:
+            content_hash = object_key.split("/")[-1].split("-")[0]
+            other.add(PageObject(content_hash=content_hash, object_key="pages/other.png",
+                                 url="https://cdn.test/pages/other.png", size=1))
+            other.commit()
+        finally:
+            other.close()
+        return url
+
+    monkeypatch.setattr(runtime.storage, "upload_file", upload_racing_other_worker)
+
+    url = asyncio.run(service.store_page(gradient_page(tmp_path / "a.png")))
+
+    assert url == "https://cdn.test/pages/other.png"
+    # 本次上传的副本已删除
+    assert stored_pages(runtime) == []
+
+def test_registration_retries_are_bounded(db, runtime, tmp_path, monkeypatch):
+    service = PageDedupService(db, runtime.storage)
+    commits = []
+
+    def conflicting_commit():
+        commits.append(1)
+        db.rollback()
+        raise IntegrityError("INSERT", {}, Exception("duplicate"))
+
+    monkeypatch.setattr(service, "_find_existing", lambda content_hash: None)
+    monkeypatch.setattr(db, "commit", conflicting_commit)
+
+    with pytest.raises(RuntimeError, match="Failed to register"):
+        asyncio.run(service.store_page(gradient_page(tmp_path / "a.png")))
+    assert len(commits) == dedup_service.REGISTER_ATTEMPTS
+
+def test_near_duplicate_page_merged_within_flipbook(db, runtime, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PAGE_PHASH_ENABLED", True)
+    service = PageDedupService(db, runtime.storage)
+
+    url = asyncio.run(service.store_page(gradient_page(tmp_path / "a.png")))
+    # 重新渲染带来的细微亮度差异：内容哈希不同，像素差在容差内
+    merged_url = asyncio.run(service.store_page(gradient_page(tmp_path / "b.png", shift=3)))
+
+    assert merged_url == url
+    assert service.reused == 1
+
+def test_similar_hash_with_different_pixels_is_not_merged(db, runtime, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PAGE_PHASH_ENABLED", True)
+    service = PageDedupService(db, runtime.storage)
+    page = gradient_page(tmp_path / "a.png")
+    # 局部改动（如页码）不改变感知哈希
+    changed = gradient_page(tmp_path / "b.png", marker=(10, 10, 14, 14))
+    with Image.open(page) as a, Image.open(changed) as b:
+        assert service._dhash(a) == service._dhash(b)
+
+    url = asyncio.run(service.store_page(page))
+    other_url = asyncio.run(service.store_page(changed))
+
+    assert other_url != url
+    assert service.reused == 0
+    assert len(stored_pages(runtime)) == 2
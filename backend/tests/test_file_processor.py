@@ -0,0 +1,143 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.models.database import Page, Task
+from app.services import file_processor
+from app.services.conversion_service import ConversionService
+from app.services.file_processor import FileProcessor
+from app.services.task_service import TaskService
+
+def fake_converter(events, total=4, fail_at=None):
+    """逐页生成纯色图片并记录渲染顺序，fail_at 页模拟渲染崩溃"""
+    def convert(path, temp_dir, skip_pages):
+        for page_num in range(1, total + 1):
+            if page_num in skip_pages:
+                yield (page_num, None, total)
+                continue
+            if page_num == fail_at:
+                raise RuntimeError(f"renderer crashed on page {page_num}")
+            page_path = os.path.join(temp_dir, f"page_{page_num}.png")
+            Image.new("RGB", (8, 8), (page_num, 0, 0)).save(page_path)
+            events.append(("render", page_num))
+            yield (page_num, page_path, total)
+    return convert
+
+def process(converter, monkeypatch, **kwargs):
+    monkeypatch.setattr(file_processor, "get_converter", lambda file_type: converter)
+    return asyncio.run(FileProcessor().process_file("task-1", "source.pdf", "application/pdf", **kwargs))
+
+def test_pages_are_checkpointed_as_they_render(runtime, monkeypatch):
+    events = []
+
+    async def on_page_uploaded(page_num, url, total):
+        events.append(("checkpoint", page_num))
+
+    pages = process(fake_converter(events, total=8), monkeypatch, on_page_uploaded=on_page_uploaded)
+
+    assert [page_num for page_num, _ in pages] == list(range(1, 9))
+    # 队列中最多 RENDER_AHEAD_PAGES 页，另有一页正在上传、一页等待入队，不会等整个文件渲染完才开始上传
+    first_blocked = file_processor.RENDER_AHEAD_PAGES + 3
+    assert events.index(("checkpoint", 1)) < events.index(("render", first_blocked))
+
+def test_crash_keeps_uploaded_pages_and_resume_skips_them(runtime, monkeypatch):
+    events = []
+    checkpoints = {}
+
+    async def on_page_uploaded(page_num, url, total):
+        checkpoints[page_num] = url
+
+    with pytest.raises(RuntimeError, match="page 3"):
+        process(fake_converter(events, fail_at=3), monkeypatch, on_page_uploaded=on_page_uploaded)
+    assert sorted(checkpoints) == [1, 2]
+
+    events.clear()
+    pages = process(fake_converter(events), monkeypatch, completed_pages=dict(checkpoints))
+
+    assert events == [("render", 3), ("render", 4)]
+    assert dict(pages) == {**checkpoints, 3: pages[2][1], 4: pages[3][1]}
+
+def test_failed_upload_stops_renderer(runtime, monkeypatch):
+    events = []
+
+    async def failing_upload(*args, **kwargs):
+        raise IOError("storage unavailable")
+
+    monkeypatch.setattr(runtime.storage, "upload_file", failing_upload)
+
+    with pytest.raises(IOError):
+        process(fake_converter(events, total=50), monkeypatch)
+    assert len(events) < 50
+
+def test_bundle_output(runtime, monkeypatch):
+    pages = process(fake_converter([]), monkeypatch, output_format="bundle")
+
+    assert [page_num for page_num, *_ in pages] == [1, 2, 3, 4]
+    assert len({url for _, url, _, _ in pages}) == 1
+    offsets = [offset for _, _, offset, _ in pages]
+    assert offsets == sorted(offsets)
+
+def test_lease_is_refreshed_while_processing(db, runtime, monkeypatch):
+    monkeypatch.setattr(settings, "TASK_LEASE_TIMEOUT", 0.3)
+    stale = datetime.utcnow() - timedelta(hours=1)
+    db.add(Task(id="task-1", original_name="a.pdf", file_key="uploads/task-1/a.pdf",
+                file_type="application/pdf", status="processing", updated_at=stale))
+    db.commit()
+
+    async def keep_lease_until_done():
+        service = ConversionService(db)
+        heartbeat = asyncio.create_task(service._keep_lease("task-1"))
+        await asyncio.sleep(1.5)
+        db.expire_all()
+        assert db.get(Task, "task-1").updated_at > stale + timedelta(minutes=59)
+
+        # 任务离开处理中状态后停止刷新
+        db.get(Task, "task-1").status = "completed"
+        db.commit()
+        await asyncio.wait_for(heartbeat, timeout=2)
+
+    asyncio.run(keep_lease_until_done())
+
+def test_database_error_still_marks_task_failed(db, runtime, monkeypatch, tmp_path):
+    db.add(Task(id="task-1", original_name="a.pdf", file_key="uploads/task-1/a.pdf",
+                file_type="application/pdf", status="uploaded"))
+    db.commit()
+    source = tmp_path / "a.pdf"
+    source.write_bytes(b"%PDF")
+    monkeypatch.setattr(file_processor, "get_converter", lambda file_type: fake_converter([]))
+
+    def duplicate_checkpoint(self, task_id, page_num, page_url, progress):
+        # 模拟并发写入同一页：提交时违反唯一约束，会话进入待回滚状态
+        self.db.add(Page(task_id=task_id, page_number=page_num, image_url=page_url))
+        self.db.add(Page(task_id=task_id, page_number=page_num, image_url=page_url))
+        self.db.commit()
+
+    monkeypatch.setattr(TaskService, "save_page_checkpoint", duplicate_checkpoint)
+
+    with pytest.raises(IntegrityError):
+        asyncio.run(ConversionService(db).convert("task-1", str(source)))
+
+    db.expire_all()
+    task = db.get(Task, "task-1")
+    assert task.status == "failed"
+    assert "UNIQUE" in task.error_message
+
+def test_duplicate_delivery_does_not_convert_again(db, runtime, monkeypatch):
+    db.add(Task(id="task-1", original_name="a.pdf", file_key="uploads/task-1/a.pdf",
+                file_type="application/pdf", status="processing", attempts=1,
+                updated_at=datetime.utcnow()))
+    db.commit()
+    events = []
+    monkeypatch.setattr(file_processor, "get_converter", lambda file_type: fake_converter(events))
+
+    assert asyncio.run(ConversionService(db).convert("task-1")) == []
+
+    db.expire_all()
+    task = db.get(Task, "task-1")
+    assert (task.status, task.attempts) == ("processing", 1)
+    assert events == []
@@ -0,0 +1,62 @@
+import pytest
+from PIL import ExifTags, Image
+
+from app.converters import image
+from app.converters.image import open_scaled_image
+from app.core.config import settings
+
+def save_jpeg(path, size, orientation=None):
+    img = Image.new("RGB", size, (200, 30, 30))
+    exif = img.getexif()
+    if orientation:
+        exif[ExifTags.Base.Orientation] = orientation
+    img.save(path, "JPEG", exif=exif)
+    return str(path)
+
+def test_output_fits_configured_size(tmp_path):
+    path = tmp_path / "wide.png"
+    Image.new("RGB", (4000, 3000)).save(path)
+
+    (page_num, page_path, total), = image.convert(str(path), str(tmp_path), set())
+
+    with Image.open(page_path) as img:
+        assert img.size == (1440, 1080)
+        assert img.width <= settings.IMAGE_MAX_WIDTH and img.height <= settings.IMAGE_MAX_HEIGHT
+
+@pytest.mark.parametrize("orientation", [5, 6, 7, 8])
+def test_rotated_exif_swaps_target_box(tmp_path, orientation):
+    # 横向存储、按EXIF旋转后为纵向的照片：旋转后仍需放进目标尺寸
+    path = save_jpeg(tmp_path / "photo.jpg", (400, 200), orientation)
+
+    img = open_scaled_image(path, (100, 50))
+
+    assert img.size == (25, 50)
+
+def test_large_jpeg_is_decoded_at_reduced_scale(tmp_path, monkeypatch):
+    path = save_jpeg(tmp_path / "scan.jpg", (4000, 3000))
+    # 原图尺寸超过Pillow的全局限制和解码预算，DCT缩放解码后的尺寸在预算内
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1_000_000)
+    monkeypatch.setattr(settings, "IMAGE_MAX_DECODE_PIXELS", 2_000_000)
+    with pytest.raises(Image.DecompressionBombError):
+        Image.open(path)
+
+    img = open_scaled_image(path, (400, 300))
+
+    assert img.size == (400, 300)
+
+def test_image_over_decode_budget_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_MAX_DECODE_PIXELS", 1_000_000)
+    path = tmp_path / "big.png"
+    Image.new("RGB", (2000, 1000)).save(path)
+
+    with pytest.raises(ValueError, match="too large"):
+        open_scaled_image(str(path), (400, 300))
+
+def test_oversized_png_fails_the_task(tmp_path, monkeypatch):
+    # 超过Pillow全局限制2倍的PNG：Image.open抛出DecompressionBombError
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    path = tmp_path / "huge.png"
+    Image.new("RGB", (100, 100)).save(path)
+
+    with pytest.raises(ValueError, match="too large"):
+        list(image.convert(str(path), str(tmp_path), set()))
@@ -0,0 +1,61 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import text
+
+from app.core.database import Base, engine, init_db
+
+# 引入迁移之前 create_all 建出的表结构（与 app/flipbook.db 一致）
+LEGACY_SCHEMA = [
+    """CREATE TABLE tasks (
+        id VARCHAR NOT NULL, original_name VARCHAR NOT NULL, file_key VARCHAR NOT NULL,
+        file_type VARCHAR NOT NULL, file_size INTEGER, status VARCHAR, progress INTEGER,
+        total_pages INTEGER, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME,
+        completed_at DATETIME, error_message TEXT, PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE pages (
+        id INTEGER NOT NULL, task_id VARCHAR NOT NULL, page_number INTEGER NOT NULL,
+        image_url VARCHAR NOT NULL, thumbnail_url VARCHAR, width INTEGER, height INTEGER,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), PRIMARY KEY (id),
+        FOREIGN KEY(task_id) REFERENCES tasks (id)
+    )""",
+]
+
+def reset_database():
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+def schema_diff():
+    with engine.connect() as conn:
+        return compare_metadata(MigrationContext.configure(conn), Base.metadata)
+
+def test_upgrade_empty_database_matches_models():
+    reset_database()
+
+    init_db()
+
+    assert schema_diff() == []
+
+def test_upgrade_legacy_database_keeps_data():
+    reset_database()
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text(
+            "INSERT INTO tasks (id, original_name, file_key, file_type, status) "
+            "VALUES ('t1', 'a.pdf', 'uploads/t1/a.pdf', 'application/pdf', 'completed')"
+        ))
+        # 旧版本重试时可能重复写入同一页
+        conn.execute(text(
+            "INSERT INTO pages (task_id, page_number, image_url) VALUES "
+            "('t1', 1, 'https://cdn/p1.png'), ('t1', 1, 'https://cdn/p1-retry.png'), ('t1', 2, 'https://cdn/p2.png')"
+        ))
+
+    init_db()
+
+    assert schema_diff() == []
+    with engine.connect() as conn:
+        task = conn.execute(text("SELECT status, attempts, upload_id FROM tasks")).one()
+        pages = conn.execute(text("SELECT page_number, image_url FROM pages ORDER BY page_number")).all()
+    assert tuple(task) == ("completed", 0, None)
+    assert [tuple(page) for page in pages] == [(1, "https://cdn/p1.png"), (2, "https://cdn/p2.png")]
@@ -0,0 +1,20 @@
+import fitz
+from PIL import Image
+
+from app.converters import pdf
+from app.core.config import settings
+
+def test_large_format_page_is_scaled_to_output(tmp_path, monkeypatch):
+    # A0页面按200 DPI渲染约6200万像素，超过上传图片的解码限制
+    monkeypatch.setattr(settings, "IMAGE_MAX_DECODE_PIXELS", 1_000_000)
+    path = tmp_path / "a0.pdf"
+    doc = fitz.open()
+    doc.new_page(width=2384, height=3370)
+    doc.save(path)
+    doc.close()
+
+    (page_num, page_path, total), = pdf.convert(str(path), str(tmp_path), set())
+
+    assert page_path.endswith("optimized_page_1.png")
+    with Image.open(page_path) as img:
+        assert img.width <= settings.IMAGE_MAX_WIDTH and img.height == settings.IMAGE_MAX_HEIGHT
@@ -0,0 +1,194 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, update
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.database import Task, Page, PageObject
+from app.services.dedup_service import PageDedupService
+from app.services.retention_service import RetentionService
+
+def add_task(db, storage, task_id, status, age, objects=1, upload_id=None):
+    """创建最后活动时间在 age 之前的任务，并在存储中放入原文件和页面对象"""
+    db.add(Task(
+        id=task_id,
+        original_name=f"{task_id}.pdf",
+        file_key=f"uploads/{task_id}/source.pdf",
+        file_type="application/pdf",
+        status=status,
+        upload_id=upload_id,
+        created_at=datetime.utcnow() - age,
+        updated_at=datetime.utcnow() - age
+    ))
+    storage.s3_client.put_object(Bucket=settings.R2_BUCKET_NAME, Key=f"uploads/{task_id}/source.pdf", Body=b"pdf")
+    for page_num in range(1, objects + 1):
+        key = f"flipbooks/{task_id}/page_{page_num}.png"
+        storage.s3_client.put_object(Bucket=settings.R2_BUCKET_NAME, Key=key, Body=b"png")
+        db.add(Page(task_id=task_id, page_number=page_num, image_url=f"{settings.R2_PUBLIC_URL}/{key}"))
+    db.commit()
+
+def add_page_object(db, storage, content_hash, last_used_age):
+    key = f"pages/{content_hash[:2]}/{content_hash}.png"
+    storage.s3_client.put_object(Bucket=settings.R2_BUCKET_NAME, Key=key, Body=b"png")
+    used_at = datetime.utcnow() - last_used_age
+    page_object = PageObject(
+        content_hash=content_hash,
+        object_key=key,
+        url=f"{settings.R2_PUBLIC_URL}/{key}",
+        size=3,
+        created_at=used_at,
+        last_used_at=used_at
+    )
+    db.add(page_object)
+    db.commit()
+    return page_object
+
+def stored_keys(storage, prefix=""):
+    return set(asyncio.run(storage.list_files(prefix)))
+
+def purge(db, storage):
+    return asyncio.run(RetentionService(db, storage).purge_expired())
+
+def test_purges_tasks_by_status_rule(db, storage):
+    add_task(db, storage, "completed-old", "completed", timedelta(days=91))
+    add_task(db, storage, "completed-new", "completed", timedelta(days=30))
+    add_task(db, storage, "failed-old", "failed", timedelta(hours=25))
+    add_task(db, storage, "failed-new", "failed", timedelta(hours=1))
+    add_task(db, storage, "processing-old", "processing", timedelta(days=200))
+    upload_id = storage.s3_client.create_multipart_upload(
+        Bucket=settings.R2_BUCKET_NAME, Key="uploads/uploading-old/source.pdf"
+    )["UploadId"]
+    add_task(db, storage, "uploading-old", "uploading", timedelta(hours=25), upload_id=upload_id)
+
+    stats = purge(db, storage)
+
+    remaining = {task_id for task_id, in db.query(Task.id)}
+    assert remaining == {"completed-new", "failed-new", "processing-old"}
+    assert stats["tasks"] == 3
+    assert stats["pages"] == 3
+    for task_id in ("completed-old", "failed-old", "uploading-old"):
+        assert not stored_keys(storage, f"uploads/{task_id}/")
+        assert not stored_keys(storage, f"flipbooks/{task_id}/")
+    for task_id in remaining:
+        assert stored_keys(storage, f"flipbooks/{task_id}/")
+    assert not storage.s3_client.list_multipart_uploads(Bucket=settings.R2_BUCKET_NAME).get("Uploads")
+
+def test_zero_retention_disables_rule(db, storage, monkeypatch):
+    monkeypatch.setattr(settings, "RETENTION_COMPLETED_DAYS", 0)
+    add_task(db, storage, "completed-old", "completed", timedelta(days=365))
+
+    purge(db, storage)
+
+    assert db.query(Task).count() == 1
+
+def test_purges_in_batches(db, storage, monkeypatch):
+    monkeypatch.setattr(settings, "RETENTION_BATCH_SIZE", 2)
+    add_task(db, storage, "task-big", "completed", timedelta(days=100), objects=1500)
+    for i in range(4):
+        add_task(db, storage, f"task-{i}", "completed", timedelta(days=100))
+
+    batch_sizes = []
+    delete_objects = storage.s3_client.delete_objects
+
+    def counting_delete_objects(**kwargs):
+        batch_sizes.append(len(kwargs["Delete"]["Objects"]))
+        return delete_objects(**kwargs)
+
+    monkeypatch.setattr(storage.s3_client, "delete_objects", counting_delete_objects)
+
+    stats = purge(db, storage)
+
+    assert db.query(Task).count() == 0
+    assert stats["objects"] == 1501 + 4 * 2
+    assert not stored_keys(storage)
+    assert max(batch_sizes) <= 1000
+    # 5个任务分3批；含1501个对象的那一批拆成两次DeleteObjects请求
+    assert len(batch_sizes) == 4
+
+def test_failed_deletes_are_retried(db, storage, monkeypatch):
+    add_task(db, storage, "task-a", "completed", timedelta(days=100))
+    add_task(db, storage, "task-b", "completed", timedelta(days=100))
+
+    delete_files = storage.delete_files
+
+    async def failing_delete_files(keys):
+        failed = await delete_files([key for key in keys if not key.startswith("flipbooks/task-a/")])
+        return failed + [key for key in keys if key.startswith("flipbooks/task-a/")]
+
+    monkeypatch.setattr(storage, "delete_files", failing_delete_files)
+    purge(db, storage)
+
+    assert {task_id for task_id, in db.query(Task.id)} == {"task-a"}
+    assert db.query(Page).filter(Page.task_id == "task-a").count() == 1
+
+    monkeypatch.setattr(storage, "delete_files", delete_files)
+    purge(db, storage)
+
+    assert db.query(Task).count() == 0
+    assert not stored_keys(storage)
+
+def test_keeps_referenced_and_recently_used_page_objects(db, storage):
+    shared = add_page_object(db, storage, "a" * 64, timedelta(days=10))
+    add_page_object(db, storage, "b" * 64, timedelta(days=10))
+    recent = add_page_object(db, storage, "c" * 64, timedelta(minutes=5))
+    expiring = add_page_object(db, storage, "d" * 64, timedelta(days=10))
+
+    add_task(db, storage, "kept", "completed", timedelta(days=1), objects=0)
+    add_task(db, storage, "expired", "completed", timedelta(days=100), objects=0)
+    db.add(Page(task_id="kept", page_number=1, image_url=shared.url))
+    db.add(Page(task_id="expired", page_number=1, image_url=shared.url))
+    db.add(Page(task_id="expired", page_number=2, image_url=expiring.url))
+    db.commit()
+
+    stats = purge(db, storage)
+
+    remaining = {content_hash for content_hash, in db.query(PageObject.content_hash)}
+    assert remaining == {shared.content_hash, recent.content_hash}
+    assert stats["page_objects"] == 2
+    assert stored_keys(storage, "pages/") == {shared.object_key, recent.object_key}
+
+def test_dedup_hit_extends_grace_period(db, storage):
+    page_object = add_page_object(db, storage, "e" * 64, timedelta(days=10))
+
+    dedup = PageDedupService(db, storage)
+    assert dedup._find_existing(page_object.content_hash) == page_object.url
+
+    purge(db, storage)
+
+    assert db.query(PageObject).count() == 1
+    assert stored_keys(storage, "pages/") == {page_object.object_key}
+
+def test_dedup_hit_during_purge_keeps_object(db, storage):
+    page_object = add_page_object(db, storage, "f" * 64, timedelta(days=10))
+
+    @event.listens_for(db, "do_orm_execute")
+    def dedup_hit_before_delete(orm_execute_state):
+        # 另一个worker在清理查询之后、删除之前命中了该对象
+        if orm_execute_state.is_delete:
+            with engine.begin() as conn:
+                conn.execute(update(PageObject).values(last_used_at=func.now()))
+
+    stats = purge(db, storage)
+
+    assert stats["page_objects"] == 0
+    assert db.query(PageObject).count() == 1
+    assert stored_keys(storage, "pages/") == {page_object.object_key}
+
+def test_storage_requests_run_outside_transaction(db, storage, monkeypatch):
+    for n in range(3):
+        add_task(db, storage, f"failed-{n}", "failed", timedelta(hours=25))
+    list_files = storage.list_files
+    in_transaction = []
+
+    async def checked_list_files(prefix):
+        in_transaction.append(db.in_transaction())
+        return await list_files(prefix)
+
+    monkeypatch.setattr(storage, "list_files", checked_list_files)
+
+    stats = purge(db, storage)
+
+    assert stats["tasks"] == 3
+    assert len(in_transaction) == 6 and not any(in_transaction)
+    assert stored_keys(storage) == set()
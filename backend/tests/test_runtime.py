@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.runtime import WorkerRuntime
+from app.tasks.celery_tasks import check_worker_pool
+
+def test_run_from_concurrent_threads():
+    runtime = WorkerRuntime(own_loop=True)
+    barrier = threading.Barrier(4)
+
+    async def convert(n):
+        await asyncio.sleep(0.05)
+        return n, id(asyncio.get_running_loop())
+
+    def task(n):
+        # threads池：多个任务同时在各自线程中调用 run
+        barrier.wait()
+        return runtime.run(convert(n))
+
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(task, range(4)))
+    finally:
+        runtime.shutdown()
+
+    assert [n for n, _ in results] == [0, 1, 2, 3]
+    assert len({loop_id for _, loop_id in results}) == 4
+    assert runtime._loops == []
+
+def test_run_reuses_loop_in_same_thread():
+    runtime = WorkerRuntime(own_loop=True)
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    try:
+        assert runtime.run(current_loop()) is runtime.run(current_loop())
+    finally:
+        runtime.shutdown()
+
+def test_run_requires_own_loop():
+    runtime = WorkerRuntime(own_loop=False)
+
+    async def noop():
+        pass
+
+    coro = noop()
+    try:
+        with pytest.raises(RuntimeError):
+            runtime.run(coro)
+    finally:
+        coro.close()
+        runtime.shutdown()
+
+@pytest.mark.parametrize("pool", ["gevent", "eventlet", "celery.concurrency.gevent:TaskPool"])
+def test_rejects_coroutine_pools(pool):
+    with pytest.raises(SystemExit, match="not supported"):
+        check_worker_pool(sender=SimpleNamespace(pool_cls=pool))
+
+@pytest.mark.parametrize("pool", ["prefork", "threads", "solo", None])
+def test_accepts_thread_and_process_pools(pool):
+    check_worker_pool(sender=SimpleNamespace(pool_cls=pool))
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.database import Task
+from app.services.task_service import TaskService
+from app.tasks import celery_tasks
+
+LEASE = 900
+
+def add_task(db, task_id="task-1", status="uploaded", age=timedelta(0), attempts=0):
+    db.add(Task(id=task_id, original_name="a.pdf", file_key=f"uploads/{task_id}/a.pdf",
+                file_type="application/pdf", status=status, attempts=attempts,
+                updated_at=datetime.utcnow() - age))
+    db.commit()
+
+def reload(db, task_id="task-1"):
+    db.expire_all()
+    return db.get(Task, task_id)
+
+@pytest.mark.parametrize("status", ["uploaded", "failed"])
+def test_start_attempt_claims_waiting_task(db, status):
+    add_task(db, status=status, attempts=1)
+
+    assert TaskService(db).start_attempt("task-1", LEASE)
+    task = reload(db)
+    assert (task.status, task.attempts) == ("processing", 2)
+
+def test_start_attempt_is_claimed_once(db):
+    add_task(db)
+
+    assert TaskService(db).start_attempt("task-1", LEASE)
+    # 重复投递的消息：另一次转换持有有效租约
+    assert not TaskService(db).start_attempt("task-1", LEASE)
+    assert reload(db).attempts == 1
+
+def test_start_attempt_takes_over_expired_lease(db):
+    add_task(db, status="processing", age=timedelta(seconds=LEASE + 60), attempts=1)
+
+    assert TaskService(db).start_attempt("task-1", LEASE)
+    assert reload(db).attempts == 2
+
+@pytest.mark.parametrize("status", ["uploading", "completing", "completed"])
+def test_start_attempt_rejects_other_states(db, status):
+    add_task(db, status=status, age=timedelta(days=1))
+
+    assert not TaskService(db).start_attempt("task-1", LEASE)
+    assert reload(db).status == status
+
+def test_requeue_only_failed_task_once(db):
+    add_task(db, status="failed", attempts=3)
+    service = TaskService(db)
+
+    assert service.requeue_task("task-1")
+    assert not service.requeue_task("task-1")
+    task = reload(db)
+    assert (task.status, task.attempts) == ("uploaded", 0)
+
+def test_claim_stale_tasks_requeues_expired_tasks(db):
+    add_task(db, "crashed", status="processing", age=timedelta(seconds=LEASE + 60))
+    add_task(db, "lost", status="uploaded", age=timedelta(seconds=LEASE + 60))
+    add_task(db, "running", status="processing")
+    add_task(db, "queued", status="uploaded")
+    service = TaskService(db)
+
+    assert sorted(task.id for task in service.claim_stale_tasks(LEASE)) == ["crashed", "lost"]
+    # 认领后刷新时间，再次扫描不会重复派发
+    assert service.claim_stale_tasks(LEASE) == []
+    # 重新排队的任务可以被下一次派发认领
+    assert reload(db, "crashed").status == "uploaded"
+    assert service.start_attempt("crashed", LEASE)
+
+def test_periodic_sweep_dispatches_stale_tasks(db, monkeypatch):
+    add_task(db, "crashed", status="processing", age=timedelta(seconds=LEASE + 60))
+    add_task(db, "running", status="processing")
+    dispatched = []
+    monkeypatch.setattr(celery_tasks.process_file_task, "delay", lambda *args: dispatched.append(args))
+
+    assert celery_tasks.requeue_stale_conversions() == 1
+    assert dispatched == [("crashed", None, "application/pdf")]
+    assert "requeue-stale-tasks" in celery_tasks.celery_app.conf.beat_schedule
@@ -0,0 +1,105 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import uploads
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import Task
+from app.services.task_service import TaskService
+
+@pytest.fixture
+def client(db, runtime, monkeypatch):
+    queued = []
+
+    def record_conversion(task_id, file_path, file_type):
+        queued.append(task_id)
+
+    monkeypatch.setattr(uploads.process_file_task, "delay", record_conversion)
+    app = FastAPI()
+    app.include_router(uploads.router, prefix="/api")
+    test_client = TestClient(app)
+    test_client.queued = queued
+    return test_client
+
+def initiate(client, size=1024):
+    response = client.post("/api/upload/initiate", json={
+        "filename": "report.pdf", "contentType": "application/pdf", "size": size
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def upload_parts(runtime, task_id, upload_id, body=b"%PDF-1.4 test"):
+    response = runtime.storage.s3_client.upload_part(
+        Bucket=settings.R2_BUCKET_NAME, Key=f"uploads/{task_id}/report.pdf",
+        UploadId=upload_id, PartNumber=1, Body=body
+    )
+    return [{"partNumber": 1, "etag": response["ETag"]}]
+
+def pending_uploads(runtime):
+    return runtime.storage.s3_client.list_multipart_uploads(Bucket=settings.R2_BUCKET_NAME).get("Uploads", [])
+
+def test_complete_queues_conversion_once(client, runtime, db):
+    upload = initiate(client)
+    parts = upload_parts(runtime, upload["taskId"], upload["uploadId"])
+    body = {"uploadId": upload["uploadId"], "parts": parts}
+
+    first = client.post(f"/api/upload/{upload['taskId']}/complete", json=body)
+    second = client.post(f"/api/upload/{upload['taskId']}/complete", json=body)
+
+    assert first.status_code == 200
+    assert second.status_code == 409
+    assert client.queued == [upload["taskId"]]
+    task = db.get(Task, upload["taskId"])
+    assert (task.status, task.upload_id) == ("uploaded", None)
+
+def test_only_one_concurrent_claim_wins(client, db):
+    upload = initiate(client)
+
+    other = SessionLocal()
+    try:
+        # 两个请求都已读到上传中的任务，只有条件更新先生效的一方认领成功
+        assert TaskService(db).claim_upload(upload["taskId"], upload["uploadId"])
+        assert not TaskService(other).claim_upload(upload["taskId"], upload["uploadId"])
+    finally:
+        other.close()
+
+def test_complete_rejects_other_upload_id(client):
+    upload = initiate(client)
+
+    response = client.post(f"/api/upload/{upload['taskId']}/complete", json={
+        "uploadId": "another-upload", "parts": [{"partNumber": 1, "etag": "\"x\""}]
+    })
+
+    assert response.status_code == 409
+    assert client.queued == []
+
+def test_failed_completion_can_be_retried(client, runtime, db):
+    upload = initiate(client)
+    parts = upload_parts(runtime, upload["taskId"], upload["uploadId"])
+
+    response = client.post(f"/api/upload/{upload['taskId']}/complete", json={
+        "uploadId": upload["uploadId"], "parts": [{"partNumber": 1, "etag": "\"wrong\""}]
+    })
+    assert response.status_code == 400
+    db.expire_all()
+    assert db.get(Task, upload["taskId"]).status == "uploading"
+
+    response = client.post(f"/api/upload/{upload['taskId']}/complete", json={
+        "uploadId": upload["uploadId"], "parts": parts
+    })
+    assert response.status_code == 200
+    assert client.queued == [upload["taskId"]]
+
+def test_initiate_aborts_upload_when_task_creation_fails(client, runtime, monkeypatch):
+    def failing_create_task(self, task_data):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(TaskService, "create_task", failing_create_task)
+
+    response = client.post("/api/upload/initiate", json={
+        "filename": "report.pdf", "contentType": "application/pdf", "size": 1024
+    })
+
+    assert response.status_code == 500
+    assert pending_uploads(runtime) == []
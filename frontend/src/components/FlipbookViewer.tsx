@@ -2,19 +2,10 @@
 
 import { useEffect, useRef, useState } from 'react';
 import { motion } from 'framer-motion';
+import { BundlePageLoader, FlipbookData } from '@/lib/api';
 
-interface FlipbookPage {
-  page: number;
-  url: string;
-  thumbnailUrl?: string;
-}
-
-interface FlipbookData {
-  taskId: string;
-  title: string;
-  totalPages: number;
-  pages: FlipbookPage[];
-}
+// 当前页之后预加载的页数
+const PRELOAD_PAGES = 2;
 
 interface FlipbookViewerProps {
   flipbookData: FlipbookData;
@@ -23,6 +14,15 @@ interface FlipbookViewerProps {
   zoom: number;
 }
 
+function preloadImage(url: string): Promise<string> {
+  return new Promise((resolve, reject) => {
+    const img = new Image();
+    img.onload = () => resolve(url);
+    img.onerror = () => reject(new Error(`Failed to load image ${url}`));
+    img.src = url;
+  });
+}
+
 export default function FlipbookViewer({ 
   flipbookData, 
   currentPage, 
@@ -30,31 +30,53 @@ export default function FlipbookViewer({
   zoom 
 }: FlipbookViewerProps) {
   const containerRef = useRef<HTMLDivElement>(null);
-  const [imagesLoaded, setImagesLoaded] = useState<Set<number>>(new Set());
+  const [pageUrls, setPageUrls] = useState<Map<number, string>>(new Map());
   const [isDragging, setIsDragging] = useState(false);
+  const loaderRef = useRef<BundlePageLoader | null>(null);
+  const requestedRef = useRef<Set<number>>(new Set());
+  const generationRef = useRef(0);
 
-  // 预加载图片
+  // 切换flipbook时重建加载器，卸载时释放打包格式生成的blob URL
   useEffect(() => {
-    const loadImages = async () => {
-      const loadPromises = flipbookData.pages.map((page) => {
-        return new Promise<number>((resolve, reject) => {
-          const img = new Image();
-          img.onload = () => resolve(page.page);
-          img.onerror = () => reject(new Error(`Failed to load page ${page.page}`));
-          img.src = page.url;
-        });
-      });
+    const loader = flipbookData.format === 'bundle' ? new BundlePageLoader(flipbookData) : null;
+    loaderRef.current = loader;
+    requestedRef.current = new Set();
+    generationRef.current += 1;
+    setPageUrls(new Map());
+    return () => loader?.dispose();
+  }, [flipbookData]);
+
+  // 只加载正在显示的页面和之后几页
+  useEffect(() => {
+    const generation = generationRef.current;
+    const loader = loaderRef.current;
+    const first = Math.max(1, currentPage - 1);
+    const last = Math.min(flipbookData.totalPages, currentPage + PRELOAD_PAGES);
 
-      try {
-        const loaded = await Promise.all(loadPromises);
-        setImagesLoaded(new Set(loaded));
-      } catch (error) {
-        console.error('Error loading images:', error);
+    for (let pageNumber = first; pageNumber <= last; pageNumber++) {
+      const page = flipbookData.pages[pageNumber - 1];
+      if (!page || requestedRef.current.has(pageNumber)) {
+        continue;
       }
-    };
+      requestedRef.current.add(pageNumber);
 
-    loadImages();
-  }, [flipbookData.pages]);
+      const source = loader ? loader.load(pageNumber) : Promise.resolve(page.url);
+      source
+        .then(preloadImage)
+        .then((url) => {
+          if (generationRef.current === generation) {
+            setPageUrls((prev) => new Map(prev).set(pageNumber, url));
+          }
+        })
+        .catch((error) => {
+          // 允许翻回该页时重新加载
+          if (generationRef.current === generation) {
+            requestedRef.current.delete(pageNumber);
+          }
+          console.error('Error loading page:', error);
+        });
+    }
+  }, [flipbookData, currentPage]);
 
   const handlePageClick = (pageNumber: number) => {
     if (!isDragging) {
@@ -90,15 +112,15 @@ export default function FlipbookViewer({
             onMouseDown={handleMouseDown}
             onMouseMove={handleMouseMove}
           >
-            {imagesLoaded.has(currentPage - 1) && (
+            {pageUrls.has(currentPage - 1) && (
               <img
-                src={flipbookData.pages[currentPage - 2]?.url}
+                src={pageUrls.get(currentPage - 1)}
                 alt={`Page ${currentPage - 1}`}
                 className="w-full h-full object-contain"
                 draggable={false}
               />
             )}
-            {!imagesLoaded.has(currentPage - 1) && (
+            {!pageUrls.has(currentPage - 1) && (
               <div className="w-full h-full flex items-center justify-center">
                 <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-gray-400"></div>
               </div>
@@ -117,15 +139,15 @@ export default function FlipbookViewer({
           onMouseDown={handleMouseDown}
           onMouseMove={handleMouseMove}
         >
-          {imagesLoaded.has(currentPage) && (
+          {pageUrls.has(currentPage) && (
             <img
-              src={flipbookData.pages[currentPage - 1]?.url}
+              src={pageUrls.get(currentPage)}
               alt={`Page ${currentPage}`}
               className="w-full h-full object-contain"
               draggable={false}
             />
           )}
-          {!imagesLoaded.has(currentPage) && (
+          {!pageUrls.has(currentPage) && (
             <div className="w-full h-full flex items-center justify-center">
               <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-gray-400"></div>
             </div>
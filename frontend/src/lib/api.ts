@@ -1,4 +1,8 @@
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+const DIRECT_UPLOAD = process.env.NEXT_PUBLIC_DIRECT_UPLOAD === 'true';
+const PART_UPLOAD_CONCURRENCY = 4;
+// 打包格式一次Range请求最多合并的相邻页数
+const BUNDLE_FETCH_PAGES = 4;
 
 export interface UploadResponse {
   taskId: string;
@@ -22,7 +26,11 @@ export interface FlipbookData {
     page: number;
     url: string;
     thumbnailUrl?: string;
+    byteOffset?: number;
+    byteLength?: number;
   }>;
+  format?: 'pages' | 'bundle';
+  bundleUrl?: string;
   createdAt: string;
 }
 
@@ -31,6 +39,10 @@ export async function uploadFile(
   file: File, 
   onProgress?: (progress: number) => void
 ): Promise<UploadResponse> {
+  if (DIRECT_UPLOAD) {
+    return uploadFileDirect(file, onProgress);
+  }
+
   const formData = new FormData();
   formData.append('file', file);
 
@@ -71,6 +83,96 @@ export async function uploadFile(
   });
 }
 
+// 直传存储：分片并行上传到预签名URL，文件内容不经过API（需在存储桶CORS中允许PUT并暴露ETag）
+interface UploadInitResponse {
+  taskId: string;
+  uploadId: string;
+  partSize: number;
+  parts: Array<{ partNumber: number; url: string }>;
+  expiresIn: number;
+}
+
+export async function uploadFileDirect(
+  file: File,
+  onProgress?: (progress: number) => void
+): Promise<UploadResponse> {
+  const initResponse = await fetch(`${API_BASE_URL}/api/upload/initiate`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ filename: file.name, contentType: file.type, size: file.size }),
+  });
+  if (!initResponse.ok) {
+    const error = await initResponse.json().catch(() => ({}));
+    throw new Error(error.detail || `Upload failed with status ${initResponse.status}`);
+  }
+  const init: UploadInitResponse = await initResponse.json();
+
+  const loaded = new Map<number, number>();
+  const reportProgress = () => {
+    if (!onProgress) return;
+    const total = Array.from(loaded.values()).reduce((sum, value) => sum + value, 0);
+    onProgress(Math.round((total / file.size) * 100));
+  };
+
+  const completed: Array<{ partNumber: number; etag: string }> = [];
+  const queue = [...init.parts];
+  const worker = async () => {
+    for (let part = queue.shift(); part; part = queue.shift()) {
+      const start = (part.partNumber - 1) * init.partSize;
+      const blob = file.slice(start, start + init.partSize);
+      const partNumber = part.partNumber;
+      const etag = await uploadPart(part.url, blob, (bytes) => {
+        loaded.set(partNumber, bytes);
+        reportProgress();
+      });
+      completed.push({ partNumber, etag });
+    }
+  };
+
+  try {
+    await Promise.all(Array.from({ length: PART_UPLOAD_CONCURRENCY }, worker));
+  } catch (error) {
+    await fetch(`${API_BASE_URL}/api/upload/${init.taskId}`, { method: 'DELETE' }).catch(() => undefined);
+    throw error;
+  }
+
+  const completeResponse = await fetch(`${API_BASE_URL}/api/upload/${init.taskId}/complete`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ uploadId: init.uploadId, parts: completed }),
+  });
+  if (!completeResponse.ok) {
+    const error = await completeResponse.json().catch(() => ({}));
+    throw new Error(error.detail || `Upload failed with status ${completeResponse.status}`);
+  }
+  return completeResponse.json();
+}
+
+function uploadPart(url: string, blob: Blob, onLoaded: (bytes: number) => void): Promise<string> {
+  return new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest();
+
+    xhr.upload.addEventListener('progress', (event) => onLoaded(event.loaded));
+
+    xhr.addEventListener('load', () => {
+      const etag = xhr.getResponseHeader('ETag');
+      if (xhr.status === 200 && etag) {
+        onLoaded(blob.size);
+        resolve(etag);
+      } else {
+        reject(new Error(`Part upload failed with status ${xhr.status}`));
+      }
+    });
+
+    xhr.addEventListener('error', () => {
+      reject(new Error('Network error during upload'));
+    });
+
+    xhr.open('PUT', url);
+    xhr.send(blob);
+  });
+}
+
 // 获取任务状态
 export async function getTaskStatus(taskId: string): Promise<TaskStatus> {
   const response = await fetch(`${API_BASE_URL}/api/task/${taskId}/status`);
@@ -117,6 +219,123 @@ export async function getFlipbookData(taskId: string): Promise<FlipbookData> {
   return response.json();
 }
 
+type FlipbookPageInfo = FlipbookData['pages'][number];
+
+// 打包格式的页面加载器：页面显示时才通过Range请求读取，字节范围相接的后续页面合并为一次请求。
+// 生成的blob URL由加载器持有，查看器卸载时调用 dispose 释放。
+export class BundlePageLoader {
+  private byPage = new Map<number, Promise<string>>();
+  private byRange = new Map<string, Promise<string>>();
+  private objectUrls = new Set<string>();
+  private disposed = false;
+
+  constructor(private data: FlipbookData) {}
+
+  load(pageNumber: number): Promise<string> {
+    const cached = this.byPage.get(pageNumber);
+    if (cached) {
+      return cached;
+    }
+
+    const index = this.data.pages.findIndex((page) => page.page === pageNumber);
+    const page = this.data.pages[index];
+    if (!page) {
+      return Promise.reject(new Error(`Page ${pageNumber} not found`));
+    }
+    if (page.byteOffset === undefined || page.byteLength === undefined) {
+      return Promise.resolve(page.url);
+    }
+
+    // 相同内容的页面共用同一字节范围，只请求一次
+    const shared = this.byRange.get(rangeKey(page));
+    if (shared) {
+      this.byPage.set(pageNumber, shared);
+      return shared;
+    }
+
+    const start = page.byteOffset;
+    let end = page.byteOffset + page.byteLength;
+    const batch = [page];
+    for (const next of this.data.pages.slice(index + 1, index + BUNDLE_FETCH_PAGES)) {
+      if (this.byPage.has(next.page) || next.byteOffset === undefined || next.byteLength === undefined) {
+        break;
+      }
+      const nextEnd = next.byteOffset + next.byteLength;
+      if (next.byteOffset >= start && nextEnd <= end) {
+        batch.push(next);
+      } else if (next.byteOffset === end) {
+        batch.push(next);
+        end = nextEnd;
+      } else {
+        break;
+      }
+    }
+
+    const request = fetchBundleRange(page.url, start, end);
+    const created: FlipbookPageInfo[] = [];
+    for (const item of batch) {
+      const key = rangeKey(item);
+      let url = this.byRange.get(key);
+      if (!url) {
+        const offset = item.byteOffset! - start;
+        url = request.then((buffer) => this.createObjectUrl(buffer.slice(offset, offset + item.byteLength!)));
+        // 预取的页面可能没有调用方等待，错误由请求页面的调用方处理
+        url.catch(() => undefined);
+        this.byRange.set(key, url);
+        created.push(item);
+      }
+      this.byPage.set(item.page, url);
+    }
+
+    // 请求失败时清除缓存，下次显示时重新加载
+    request.catch(() => {
+      for (const item of created) {
+        this.byRange.delete(rangeKey(item));
+      }
+      for (const item of batch) {
+        this.byPage.delete(item.page);
+      }
+    });
+
+    return this.byPage.get(pageNumber)!;
+  }
+
+  // 释放所有已生成的blob URL，之后才完成的请求生成的URL立即释放
+  dispose() {
+    this.disposed = true;
+    this.objectUrls.forEach((url) => URL.revokeObjectURL(url));
+    this.objectUrls.clear();
+    this.byPage.clear();
+    this.byRange.clear();
+  }
+
+  private createObjectUrl(buffer: ArrayBuffer): string {
+    const url = URL.createObjectURL(new Blob([buffer], { type: 'image/png' }));
+    if (this.disposed) {
+      URL.revokeObjectURL(url);
+    } else {
+      this.objectUrls.add(url);
+    }
+    return url;
+  }
+}
+
+function rangeKey(page: FlipbookPageInfo): string {
+  return `${page.byteOffset}-${page.byteLength}`;
+}
+
+// 读取bundle中 [start, end) 的字节，存储忽略Range返回整个对象时自行截取
+async function fetchBundleRange(url: string, start: number, end: number): Promise<ArrayBuffer> {
+  const response = await fetch(url, { headers: { Range: `bytes=${start}-${end - 1}` } });
+  if (response.status === 206) {
+    return response.arrayBuffer();
+  }
+  if (response.ok) {
+    return (await response.arrayBuffer()).slice(start, end);
+  }
+  throw new Error(`Failed to load bundle range ${start}-${end - 1}: ${response.status}`);
+}
+
 // src/lib/utils.ts
 export function cn(...classes: (string | undefined | false)[]) {
   return classes.filter(Boolean).join(' ');
@@ -135,4 +354,4 @@ export function formatFileSize(bytes: number): string {
 export function formatDate(timestamp: string | number): string {
   const date = new Date(typeof timestamp === 'string' ? parseInt(timestamp) : timestamp);
   return date.toLocaleString('zh-CN');
-}
\ No newline at end of file
+}